@@ -332,7 +332,8 @@ class CLIInterface:
                     profit = pos.get('actual_profit', 0)
                     total_profit += profit
                     status_icon = "📈" if profit > 0 else "📉"
-                    close_time = pos.get('close_time', '未知時間')
+                    close_time = pos.get('close_time')
+                    close_time = datetime.fromtimestamp(close_time).strftime('%Y-%m-%d %H:%M:%S') if close_time else '未知時間'
                     print(f"   {status_icon} {pos['symbol']}: {profit:+.4f} USDT ({close_time})")
                 
                 if closed_positions:
@@ -5,17 +5,147 @@
 
 import sqlite3
 import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Iterator
 import json
 import logging
 from dataclasses import asdict
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from config_funding import get_config
 
 config = get_config()
 logger = logging.getLogger("DatabaseManager")
 
+# update_position 允許更新的欄位
+_ALLOWED_POSITION_COLS = frozenset({
+    'opportunity_id', 'position_type', 'symbol', 'size', 'entry_price', 'exit_price',
+    'long_exchange', 'short_exchange', 'open_time', 'close_time', 'status',
+    'estimated_profit', 'actual_profit', 'notes'
+})
+
+
+# performance_daily 增量維護語句，{row} 為 NEW/OLD，{op} 為 +/-
+_POSITION_DELTA_SQL = '''
+    INSERT INTO performance_daily (date) VALUES (date({row}.open_time, 'unixepoch', 'localtime'))
+    ON CONFLICT(date) DO NOTHING;
+    UPDATE performance_daily SET
+        positions = positions {op} 1,
+        closed_positions = closed_positions {op} ({row}.status = 'closed'),
+        profitable_positions = profitable_positions {op} (COALESCE({row}.actual_profit, 0) > 0),
+        profit_count = profit_count {op} ({row}.actual_profit IS NOT NULL),
+        total_profit = total_profit {op} COALESCE({row}.actual_profit, 0)
+    WHERE date = date({row}.open_time, 'unixepoch', 'localtime');
+'''
+
+# 最大/最小利潤無法遞減維護，按當日範圍重新計算（先用 open_time 索引收窄到前後一天）
+_POSITION_EXTREMES_SQL = '''
+    UPDATE performance_daily SET
+        max_profit = (SELECT MAX(actual_profit) FROM positions
+                      WHERE open_time BETWEEN {row}.open_time - 86400 AND {row}.open_time + 86400
+                        AND date(open_time, 'unixepoch', 'localtime') = performance_daily.date),
+        min_profit = (SELECT MIN(actual_profit) FROM positions
+                      WHERE open_time BETWEEN {row}.open_time - 86400 AND {row}.open_time + 86400
+                        AND date(open_time, 'unixepoch', 'localtime') = performance_daily.date)
+    WHERE date = date({row}.open_time, 'unixepoch', 'localtime');
+'''
+
+_OPPORTUNITY_DELTA_SQL = '''
+    INSERT INTO performance_daily (date) VALUES (date({row}.created_at, 'unixepoch', 'localtime'))
+    ON CONFLICT(date) DO NOTHING;
+    UPDATE performance_daily SET
+        opportunities = opportunities {op} 1,
+        profitable_opportunities = profitable_opportunities {op} (COALESCE({row}.net_profit_8h, 0) > 0)
+    WHERE date = date({row}.created_at, 'unixepoch', 'localtime');
+'''
+
+
+# 數據庫結構版本（PRAGMA user_version）
+# 1: 時間欄位改為 INTEGER Unix 秒
+# 2: 套利機會的常用進出場條件拆分為獨立欄位
+# 3: 新增 positions(opportunity_id) 索引
+SCHEMA_VERSION = 3
+
+# INSERT ... RETURNING 需要 SQLite 3.35+，舊版本改用 cursor.lastrowid
+_RETURNING_SUPPORTED = sqlite3.sqlite_version_info >= (3, 35)
+
+_INSERT_OPPORTUNITY_SQL = '''
+    INSERT INTO arbitrage_opportunities 
+    (strategy_type, symbol, primary_exchange, secondary_exchange, funding_rate_diff,
+     estimated_profit_8h, commission_cost, net_profit_8h, confidence_score, risk_level,
+     entry_action, target_spread, entry_threshold,
+     funding_collection_time, min_spread_threshold, max_loss_threshold,
+     entry_conditions, exit_conditions, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CAST(strftime('%s', 'now') AS INTEGER))
+''' + (' RETURNING id' if _RETURNING_SUPPORTED else '')
+
+# 以 Unix 秒存儲的時間欄位
+_EPOCH_POSITION_COLS = ('open_time', 'close_time')
+
+
+# create_tables 創建的數據表
+_REQUIRED_TABLES = frozenset({
+    'funding_rates', 'arbitrage_opportunities', 'positions', 'system_stats',
+    'exchange_status', 'performance_daily'
+})
+
+# PRAGMA optimize 最短間隔（秒）
+OPTIMIZE_INTERVAL = 3600
+
+# 每次清理後增量回收的最大頁數
+INCREMENTAL_VACUUM_PAGES = 1000
+
+# 內存映射讀取上限（字節）；佔用的是進程地址空間而非物理內存，64 位系統上可放心設置
+MMAP_SIZE = 256 * 1024 * 1024
+
+# 進出場條件中拆分為獨立欄位的鍵 -> (欄位名, 欄位類型)
+_ENTRY_CONDITION_COLS = {
+    'action': ('entry_action', 'TEXT'),
+    'target_spread': ('target_spread', 'REAL'),
+    'threshold': ('entry_threshold', 'REAL'),
+}
+_EXIT_CONDITION_COLS = {
+    'funding_collection_time': ('funding_collection_time', 'INTEGER'),
+    'min_spread_threshold': ('min_spread_threshold', 'REAL'),
+    'max_loss_threshold': ('max_loss_threshold', 'REAL'),
+}
+
+
+def _dumps_extra(conditions: Dict, known_keys) -> Optional[str]:
+    """序列化未拆分為欄位的其餘條件，沒有則返回 None"""
+    extra = {k: v for k, v in conditions.items() if k not in known_keys}
+    if not extra:
+        return None
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(extra, default=str).decode()
+    return json.dumps(extra, default=str)
+
+
+def _to_epoch(value) -> Optional[int]:
+    """將 datetime / ISO 字符串 / 數值轉換為 Unix 秒"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, str):
+        return int(datetime.fromisoformat(value).timestamp())
+    return int(value)
+
+
+@functools.lru_cache(maxsize=64)
+def _update_position_sql(cols: tuple) -> str:
+    """按欄位組合緩存 UPDATE 語句，讓相同組合重用同一條 SQL"""
+    return f"UPDATE positions SET {', '.join(f'{col} = ?' for col in cols)} WHERE position_id = ?"
+
 
 class DatabaseManager:
     """數據庫管理器"""
@@ -23,14 +153,30 @@ class DatabaseManager:
     def __init__(self, db_path: str = None):
         self.db_path = db_path or config.system.database_url.replace('sqlite:///', '')
         self.connection = None
+        self._last_optimize = time.monotonic()
         self.init_database()
     
     def init_database(self):
         """初始化數據庫"""
         try:
-            self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.connection = sqlite3.connect(
+                self.db_path,
+                check_same_thread=False,
+                timeout=5.0,
+                cached_statements=256  # 容納 update_position 的各欄位組合語句
+            )
             self.connection.row_factory = sqlite3.Row  # 讓查詢結果可以像字典一樣訪問
             
+            # 必須在建表前設置才對新數據庫生效；已有數據庫需 VACUUM 一次後才會切換
+            self.connection.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            
+            # 每次寫入都 commit，WAL + NORMAL 避免每筆提交都 fsync
+            self.connection.execute('PRAGMA journal_mode = WAL')
+            self.connection.execute('PRAGMA synchronous = NORMAL')
+            
+            # 統計類查詢經由 mmap 直接讀取頁緩存，省去 read() 複製
+            self.connection.execute(f'PRAGMA mmap_size = {MMAP_SIZE}')
+            
             self.create_tables()
             logger.info(f"數據庫初始化完成: {self.db_path}")
             
@@ -41,6 +187,15 @@ class DatabaseManager:
         """創建數據表"""
         cursor = self.connection.cursor()
         
+        cursor.execute('PRAGMA user_version')
+        schema_version = cursor.fetchone()[0]
+        
+        # 已是最新結構時跳過全部 DDL
+        if schema_version == SCHEMA_VERSION:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            if _REQUIRED_TABLES <= {row['name'] for row in cursor.fetchall()}:
+                return
+        
         # 資金費率歷史表
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS funding_rates (
@@ -52,8 +207,8 @@ class DatabaseManager:
                 mark_price REAL,
                 index_price REAL,
                 next_funding_time DATETIME,
-                timestamp DATETIME NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                timestamp INTEGER NOT NULL,  -- Unix 秒
+                created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
             )
         ''')
         
@@ -71,9 +226,15 @@ class DatabaseManager:
                 net_profit_8h REAL NOT NULL,
                 confidence_score REAL NOT NULL,
                 risk_level TEXT NOT NULL,
-                entry_conditions TEXT,  -- JSON
-                exit_conditions TEXT,   -- JSON
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                entry_action TEXT,
+                target_spread REAL,
+                entry_threshold REAL,
+                funding_collection_time INTEGER,  -- Unix 秒
+                min_spread_threshold REAL,
+                max_loss_threshold REAL,
+                entry_conditions TEXT,  -- JSON，僅存放未拆分的其餘條件
+                exit_conditions TEXT,   -- JSON，僅存放未拆分的其餘條件
+                created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
             )
         ''')
         
@@ -90,13 +251,13 @@ class DatabaseManager:
                 exit_price REAL,
                 long_exchange TEXT,
                 short_exchange TEXT,
-                open_time DATETIME NOT NULL,
-                close_time DATETIME,
+                open_time INTEGER NOT NULL,  -- Unix 秒
+                close_time INTEGER,
                 status TEXT NOT NULL,
                 estimated_profit REAL,
                 actual_profit REAL,
                 notes TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
                 FOREIGN KEY (opportunity_id) REFERENCES arbitrage_opportunities (id)
             )
         ''')
@@ -124,13 +285,37 @@ class DatabaseManager:
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 exchange TEXT NOT NULL,
                 status TEXT NOT NULL,  -- online, offline, error
-                last_update DATETIME NOT NULL,
+                last_update INTEGER NOT NULL,  -- Unix 秒
                 error_message TEXT,
                 api_calls_count INTEGER DEFAULT 0,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         ''')
         
+        if schema_version < 1:
+            self._migrate_timestamps_to_epoch(cursor)
+        if schema_version < 2:
+            self._migrate_condition_columns(cursor)
+        
+        # 每日績效匯總表（由觸發器增量維護，供 get_performance_stats 讀取）
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'performance_daily'")
+        performance_table_exists = cursor.fetchone() is not None
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS performance_daily (
+                date DATE PRIMARY KEY,
+                opportunities INTEGER DEFAULT 0,
+                profitable_opportunities INTEGER DEFAULT 0,
+                positions INTEGER DEFAULT 0,
+                closed_positions INTEGER DEFAULT 0,
+                profitable_positions INTEGER DEFAULT 0,
+                profit_count INTEGER DEFAULT 0,
+                total_profit REAL DEFAULT 0.0,
+                max_profit REAL,
+                min_profit REAL
+            )
+        ''')
+        
         # 創建索引
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_funding_rates_exchange_symbol ON funding_rates(exchange, symbol)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_funding_rates_timestamp ON funding_rates(timestamp)')
@@ -138,17 +323,154 @@ class DatabaseManager:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_positions_position_id ON positions(position_id)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_positions_status ON positions(status)')
         
+        # 交易所狀態每個交易所只保留一行（舊版本可能遺留重複記錄，保留最新一條）
+        cursor.execute('''
+            DELETE FROM exchange_status
+            WHERE id NOT IN (SELECT MAX(id) FROM exchange_status GROUP BY exchange)
+        ''')
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_exchange_status_exchange ON exchange_status(exchange)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_positions_open_time ON positions(open_time)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_positions_opportunity_id ON positions(opportunity_id)')
+        
+        # 績效匯總觸發器
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_positions_insert_perf AFTER INSERT ON positions
+            BEGIN
+                {_POSITION_DELTA_SQL.format(row='NEW', op='+')}
+                {_POSITION_EXTREMES_SQL.format(row='NEW')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_positions_update_perf
+            AFTER UPDATE OF open_time, status, actual_profit ON positions
+            BEGIN
+                {_POSITION_DELTA_SQL.format(row='OLD', op='-')}
+                {_POSITION_DELTA_SQL.format(row='NEW', op='+')}
+                {_POSITION_EXTREMES_SQL.format(row='OLD')}
+                {_POSITION_EXTREMES_SQL.format(row='NEW')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_positions_delete_perf AFTER DELETE ON positions
+            BEGIN
+                {_POSITION_DELTA_SQL.format(row='OLD', op='-')}
+                {_POSITION_EXTREMES_SQL.format(row='OLD')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_opportunities_insert_perf AFTER INSERT ON arbitrage_opportunities
+            BEGIN
+                {_OPPORTUNITY_DELTA_SQL.format(row='NEW', op='+')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_opportunities_delete_perf AFTER DELETE ON arbitrage_opportunities
+            BEGIN
+                {_OPPORTUNITY_DELTA_SQL.format(row='OLD', op='-')}
+            END
+        ''')
+        
+        # 新建匯總表或時間格式遷移後從現有數據回填
+        if not performance_table_exists or schema_version < 1:
+            self._rebuild_performance_daily(cursor)
+        
+        cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        
+        # 首次建庫時收集統計信息供查詢規劃器使用，之後由 PRAGMA optimize 增量維護
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+        if cursor.fetchone() is None:
+            cursor.execute('ANALYZE')
+        
         self.connection.commit()
         logger.info("數據表創建完成")
     
+    def _migrate_timestamps_to_epoch(self, cursor):
+        """將舊版 DATETIME 文本時間轉換為 Unix 秒
+        
+        Python 寫入的時間為本地時間，CURRENT_TIMESTAMP 默認值為 UTC。
+        舊表的 created_at 默認值仍為文本，因此寫入時顯式提供 created_at。
+        """
+        # 舊的匯總觸發器按文本日期計算，先移除後重建
+        for trigger in ('trg_positions_insert_perf', 'trg_positions_update_perf', 'trg_positions_delete_perf',
+                        'trg_opportunities_insert_perf', 'trg_opportunities_delete_perf'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        
+        local_columns = {
+            'funding_rates': ('timestamp',),
+            'positions': ('open_time', 'close_time'),
+            'exchange_status': ('last_update',),
+        }
+        utc_columns = {
+            'funding_rates': ('created_at',),
+            'arbitrage_opportunities': ('created_at',),
+            'positions': ('created_at',),
+            'exchange_status': ('created_at',),
+        }
+        for table, columns in local_columns.items():
+            for col in columns:
+                cursor.execute(f'''
+                    UPDATE {table} SET {col} = CAST(strftime('%s', {col}, 'utc') AS INTEGER)
+                    WHERE typeof({col}) = 'text'
+                ''')
+        for table, columns in utc_columns.items():
+            for col in columns:
+                cursor.execute(f'''
+                    UPDATE {table} SET {col} = CAST(strftime('%s', {col}) AS INTEGER)
+                    WHERE typeof({col}) = 'text'
+                ''')
+    
+    def _migrate_condition_columns(self, cursor):
+        """為舊版套利機會表補上條件欄位"""
+        cursor.execute('PRAGMA table_info(arbitrage_opportunities)')
+        existing = {row['name'] for row in cursor.fetchall()}
+        for col, col_type in (*_ENTRY_CONDITION_COLS.values(), *_EXIT_CONDITION_COLS.values()):
+            if col not in existing:
+                cursor.execute(f'ALTER TABLE arbitrage_opportunities ADD COLUMN {col} {col_type}')
+    
+    def _rebuild_performance_daily(self, cursor):
+        """從倉位和套利機會表重建每日績效匯總"""
+        cursor.execute('DELETE FROM performance_daily')
+        cursor.execute('''
+            INSERT INTO performance_daily
+            (date, positions, closed_positions, profitable_positions, profit_count,
+             total_profit, max_profit, min_profit)
+            SELECT
+                date(open_time, 'unixepoch', 'localtime'),
+                COUNT(*),
+                SUM(status = 'closed'),
+                SUM(COALESCE(actual_profit, 0) > 0),
+                COUNT(actual_profit),
+                COALESCE(SUM(actual_profit), 0),
+                MAX(actual_profit),
+                MIN(actual_profit)
+            FROM positions
+            GROUP BY date(open_time, 'unixepoch', 'localtime')
+        ''')
+        cursor.execute('''
+            INSERT INTO performance_daily (date, opportunities, profitable_opportunities)
+            SELECT
+                date(created_at, 'unixepoch', 'localtime'),
+                COUNT(*),
+                SUM(COALESCE(net_profit_8h, 0) > 0)
+            FROM arbitrage_opportunities
+            WHERE true
+            GROUP BY date(created_at, 'unixepoch', 'localtime')
+            ON CONFLICT(date) DO UPDATE SET
+                opportunities = excluded.opportunities,
+                profitable_opportunities = excluded.profitable_opportunities
+        ''')
+    
     def save_funding_rate(self, funding_rate_info):
         """保存資金費率數據"""
         try:
             cursor = self.connection.cursor()
             cursor.execute('''
                 INSERT INTO funding_rates 
-                (exchange, symbol, funding_rate, predicted_rate, mark_price, index_price, next_funding_time, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                (exchange, symbol, funding_rate, predicted_rate, mark_price, index_price, next_funding_time, timestamp,
+                 created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?,
+                        COALESCE(?, CAST(strftime('%s', 'now') AS INTEGER)),  -- 未提供時間時由 SQLite 取當前時間
+                        CAST(strftime('%s', 'now') AS INTEGER))
             ''', (
                 funding_rate_info.exchange,
                 funding_rate_info.symbol,
@@ -157,7 +479,7 @@ class DatabaseManager:
                 funding_rate_info.mark_price,
                 funding_rate_info.index_price,
                 funding_rate_info.next_funding_time,
-                funding_rate_info.timestamp
+                _to_epoch(funding_rate_info.timestamp)
             ))
             self.connection.commit()
             
@@ -167,14 +489,11 @@ class DatabaseManager:
     def save_arbitrage_opportunity(self, opportunity) -> int:
         """保存套利機會，返回ID"""
         try:
+            entry = opportunity.entry_conditions or {}
+            exit_ = opportunity.exit_conditions or {}
+            
             cursor = self.connection.cursor()
-            cursor.execute('''
-                INSERT INTO arbitrage_opportunities 
-                (strategy_type, symbol, primary_exchange, secondary_exchange, funding_rate_diff,
-                 estimated_profit_8h, commission_cost, net_profit_8h, confidence_score, risk_level,
-                 entry_conditions, exit_conditions)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            cursor.execute(_INSERT_OPPORTUNITY_SQL, (
                 opportunity.strategy_type.value,
                 opportunity.symbol,
                 opportunity.primary_exchange,
@@ -185,11 +504,19 @@ class DatabaseManager:
                 opportunity.net_profit_8h,
                 opportunity.confidence_score,
                 opportunity.risk_level,
-                json.dumps(opportunity.entry_conditions),
-                json.dumps(opportunity.exit_conditions)
+                entry.get('action'),
+                entry.get('target_spread'),
+                entry.get('threshold'),
+                _to_epoch(exit_.get('funding_collection_time')),
+                exit_.get('min_spread_threshold'),
+                exit_.get('max_loss_threshold'),
+                _dumps_extra(entry, _ENTRY_CONDITION_COLS),
+                _dumps_extra(exit_, _EXIT_CONDITION_COLS)
             ))
+            # RETURNING 的結果需在 commit 前取出
+            opportunity_id = cursor.fetchone()[0] if _RETURNING_SUPPORTED else cursor.lastrowid
             self.connection.commit()
-            return cursor.lastrowid
+            return opportunity_id
             
         except Exception as e:
             logger.error(f"保存套利機會失敗: {e}")
@@ -198,29 +525,30 @@ class DatabaseManager:
     def save_position(self, position_data: Dict) -> bool:
         """保存倉位記錄"""
         try:
+            get = position_data.get
             cursor = self.connection.cursor()
             cursor.execute('''
                 INSERT INTO positions 
                 (position_id, opportunity_id, position_type, symbol, size, entry_price, exit_price,
                  long_exchange, short_exchange, open_time, close_time, status, estimated_profit, 
-                 actual_profit, notes)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                 actual_profit, notes, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CAST(strftime('%s', 'now') AS INTEGER))
             ''', (
-                position_data.get('position_id'),
-                position_data.get('opportunity_id'),
-                position_data.get('type'),
-                position_data.get('symbol'),
-                position_data.get('size'),
-                position_data.get('entry_price'),
-                position_data.get('exit_price'),
-                position_data.get('long_exchange'),
-                position_data.get('short_exchange'),
-                position_data.get('open_time'),
-                position_data.get('close_time'),
-                position_data.get('status'),
-                position_data.get('estimated_profit'),
-                position_data.get('actual_profit'),
-                position_data.get('notes')
+                get('position_id'),
+                get('opportunity_id'),
+                get('type'),
+                get('symbol'),
+                get('size'),
+                get('entry_price'),
+                get('exit_price'),
+                get('long_exchange'),
+                get('short_exchange'),
+                _to_epoch(get('open_time')),
+                _to_epoch(get('close_time')),
+                get('status'),
+                get('estimated_profit'),
+                get('actual_profit'),
+                get('notes')
             ))
             self.connection.commit()
             return True
@@ -232,20 +560,18 @@ class DatabaseManager:
     def update_position(self, position_id: str, update_data: Dict) -> bool:
         """更新倉位記錄"""
         try:
-            cursor = self.connection.cursor()
-            
-            # 構建更新語句
-            set_clauses = []
-            values = []
-            
-            for key, value in update_data.items():
-                set_clauses.append(f"{key} = ?")
-                values.append(value)
+            invalid_cols = update_data.keys() - _ALLOWED_POSITION_COLS
+            if invalid_cols:
+                raise ValueError(f"不允許更新的欄位: {', '.join(sorted(invalid_cols))}")
             
+            # 欄位排序後作為緩存鍵，相同欄位組合共用同一條語句
+            cols = tuple(sorted(update_data))
+            values = [_to_epoch(update_data[col]) if col in _EPOCH_POSITION_COLS else update_data[col]
+                      for col in cols]
             values.append(position_id)
             
-            query = f"UPDATE positions SET {', '.join(set_clauses)} WHERE position_id = ?"
-            cursor.execute(query, values)
+            cursor = self.connection.cursor()
+            cursor.execute(_update_position_sql(cols), values)
             self.connection.commit()
             return True
             
@@ -253,46 +579,54 @@ class DatabaseManager:
             logger.error(f"更新倉位記錄失敗: {e}")
             return False
     
+    def iter_positions(self, status: str = None, limit: int = 100) -> Iterator[Dict]:
+        """逐行產出倉位記錄"""
+        cursor = self.connection.cursor()
+        
+        if status:
+            cursor.execute('''
+                SELECT * FROM positions 
+                WHERE status = ? 
+                ORDER BY created_at DESC 
+                LIMIT ?
+            ''', (status, limit))
+        else:
+            cursor.execute('''
+                SELECT * FROM positions 
+                ORDER BY created_at DESC 
+                LIMIT ?
+            ''', (limit,))
+        
+        for row in cursor:
+            yield dict(row)
+    
     def get_positions(self, status: str = None, limit: int = 100) -> List[Dict]:
         """獲取倉位記錄"""
         try:
-            cursor = self.connection.cursor()
-            
-            if status:
-                cursor.execute('''
-                    SELECT * FROM positions 
-                    WHERE status = ? 
-                    ORDER BY created_at DESC 
-                    LIMIT ?
-                ''', (status, limit))
-            else:
-                cursor.execute('''
-                    SELECT * FROM positions 
-                    ORDER BY created_at DESC 
-                    LIMIT ?
-                ''', (limit,))
-            
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+            return list(self.iter_positions(status, limit))
             
         except Exception as e:
             logger.error(f"獲取倉位記錄失敗: {e}")
             return []
     
+    def iter_funding_rate_history(self, exchange: str, symbol: str, days: int = 7) -> Iterator[Dict]:
+        """逐行產出資金費率歷史"""
+        cursor = self.connection.cursor()
+        start_ts = _to_epoch(datetime.now() - timedelta(days=days))
+        
+        cursor.execute('''
+            SELECT * FROM funding_rates 
+            WHERE exchange = ? AND symbol = ? AND timestamp >= ?
+            ORDER BY timestamp DESC
+        ''', (exchange, symbol, start_ts))
+        
+        for row in cursor:
+            yield dict(row)
+    
     def get_funding_rate_history(self, exchange: str, symbol: str, days: int = 7) -> List[Dict]:
         """獲取資金費率歷史"""
         try:
-            cursor = self.connection.cursor()
-            start_date = datetime.now() - timedelta(days=days)
-            
-            cursor.execute('''
-                SELECT * FROM funding_rates 
-                WHERE exchange = ? AND symbol = ? AND timestamp >= ?
-                ORDER BY timestamp DESC
-            ''', (exchange, symbol, start_date))
-            
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+            return list(self.iter_funding_rate_history(exchange, symbol, days))
             
         except Exception as e:
             logger.error(f"獲取資金費率歷史失敗: {e}")
@@ -326,50 +660,42 @@ class DatabaseManager:
             logger.error(f"更新每日統計失敗: {e}")
     
     def get_performance_stats(self, days: int = 30) -> Dict:
-        """獲取性能統計"""
+        """獲取性能統計（按日匯總，精確到天）"""
         try:
             cursor = self.connection.cursor()
-            start_date = datetime.now() - timedelta(days=days)
+            start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
             
-            # 總體統計
             cursor.execute('''
                 SELECT 
-                    COUNT(*) as total_opportunities,
-                    SUM(CASE WHEN net_profit_8h > 0 THEN 1 ELSE 0 END) as profitable_opportunities
-                FROM arbitrage_opportunities 
-                WHERE created_at >= ?
+                    SUM(opportunities) as total_opportunities,
+                    SUM(profitable_opportunities) as profitable_opportunities,
+                    SUM(positions) as total_positions,
+                    SUM(closed_positions) as closed_positions,
+                    SUM(profitable_positions) as profitable_positions,
+                    SUM(profit_count) as profit_count,
+                    SUM(total_profit) as total_profit,
+                    MAX(max_profit) as max_profit,
+                    MIN(min_profit) as min_profit
+                FROM performance_daily 
+                WHERE date >= ?
             ''', (start_date,))
             
-            opp_stats = cursor.fetchone()
-            
-            # 倉位統計
-            cursor.execute('''
-                SELECT 
-                    COUNT(*) as total_positions,
-                    SUM(CASE WHEN status = 'closed' THEN 1 ELSE 0 END) as closed_positions,
-                    SUM(CASE WHEN actual_profit > 0 THEN 1 ELSE 0 END) as profitable_positions,
-                    AVG(actual_profit) as avg_profit,
-                    SUM(actual_profit) as total_profit,
-                    MAX(actual_profit) as max_profit,
-                    MIN(actual_profit) as min_profit
-                FROM positions 
-                WHERE open_time >= ?
-            ''', (start_date,))
-            
-            pos_stats = cursor.fetchone()
+            stats = cursor.fetchone()
+            total_profit = stats['total_profit'] or 0
+            profit_count = stats['profit_count'] or 0
             
             return {
                 'period_days': days,
-                'total_opportunities': opp_stats['total_opportunities'] or 0,
-                'profitable_opportunities': opp_stats['profitable_opportunities'] or 0,
-                'total_positions': pos_stats['total_positions'] or 0,
-                'closed_positions': pos_stats['closed_positions'] or 0,
-                'profitable_positions': pos_stats['profitable_positions'] or 0,
-                'success_rate': (pos_stats['profitable_positions'] or 0) / max(pos_stats['closed_positions'] or 1, 1) * 100,
-                'avg_profit': pos_stats['avg_profit'] or 0,
-                'total_profit': pos_stats['total_profit'] or 0,
-                'max_profit': pos_stats['max_profit'] or 0,
-                'min_profit': pos_stats['min_profit'] or 0
+                'total_opportunities': stats['total_opportunities'] or 0,
+                'profitable_opportunities': stats['profitable_opportunities'] or 0,
+                'total_positions': stats['total_positions'] or 0,
+                'closed_positions': stats['closed_positions'] or 0,
+                'profitable_positions': stats['profitable_positions'] or 0,
+                'success_rate': (stats['profitable_positions'] or 0) / max(stats['closed_positions'] or 1, 1) * 100,
+                'avg_profit': total_profit / profit_count if profit_count else 0,
+                'total_profit': total_profit,
+                'max_profit': stats['max_profit'] or 0,
+                'min_profit': stats['min_profit'] or 0
             }
             
         except Exception as e:
@@ -406,10 +732,15 @@ class DatabaseManager:
         try:
             cursor = self.connection.cursor()
             cursor.execute('''
-                INSERT OR REPLACE INTO exchange_status 
+                INSERT INTO exchange_status 
                 (exchange, status, last_update, error_message, api_calls_count)
-                VALUES (?, ?, ?, ?, COALESCE((SELECT api_calls_count FROM exchange_status WHERE exchange = ?) + 1, 1))
-            ''', (exchange, status, datetime.now(), error_message, exchange))
+                VALUES (?, ?, CAST(strftime('%s', 'now') AS INTEGER), ?, 1)
+                ON CONFLICT(exchange) DO UPDATE SET
+                    status = excluded.status,
+                    last_update = excluded.last_update,
+                    error_message = excluded.error_message,
+                    api_calls_count = api_calls_count + 1
+            ''', (exchange, status, error_message))
             self.connection.commit()
             
         except Exception as e:
@@ -419,39 +750,120 @@ class DatabaseManager:
         """清理舊數據"""
         try:
             cursor = self.connection.cursor()
-            cutoff_date = datetime.now() - timedelta(days=days)
+            cutoff_ts = _to_epoch(datetime.now() - timedelta(days=days))
             
             # 清理舊的資金費率數據
-            cursor.execute('DELETE FROM funding_rates WHERE timestamp < ?', (cutoff_date,))
+            cursor.execute('DELETE FROM funding_rates WHERE timestamp < ?', (cutoff_ts,))
             
             # 清理舊的套利機會數據（但保留有關聯倉位的）
             cursor.execute('''
                 DELETE FROM arbitrage_opportunities 
-                WHERE created_at < ? AND id NOT IN (
-                    SELECT DISTINCT opportunity_id FROM positions WHERE opportunity_id IS NOT NULL
+                WHERE id IN (
+                    SELECT o.id FROM arbitrage_opportunities o
+                    LEFT JOIN positions p ON p.opportunity_id = o.id
+                    WHERE o.created_at < ? AND p.opportunity_id IS NULL
                 )
-            ''', (cutoff_date,))
+            ''', (cutoff_ts,))
             
             self.connection.commit()
             logger.info(f"清理了 {days} 天前的舊數據")
             
+            # 回收刪除後的空閒頁，避免數據庫文件只增不減
+            freelist_before = self.connection.execute('PRAGMA freelist_count').fetchone()[0]
+            # execute() 只執行一步（每步回收一頁），executescript 會執行到完成
+            self.connection.executescript(f'PRAGMA incremental_vacuum({INCREMENTAL_VACUUM_PAGES});')
+            freelist_after = self.connection.execute('PRAGMA freelist_count').fetchone()[0]
+            logger.info(f"增量回收 {freelist_before - freelist_after} 頁，剩餘空閒頁 {freelist_after}")
+            
+            # 定期更新查詢規劃統計
+            if time.monotonic() - self._last_optimize >= OPTIMIZE_INTERVAL:
+                self.connection.execute('PRAGMA optimize')
+                self._last_optimize = time.monotonic()
+            
         except Exception as e:
             logger.error(f"清理舊數據失敗: {e}")
     
     def close(self):
         """關閉數據庫連接"""
         if self.connection:
+            try:
+                self.connection.execute('PRAGMA optimize')
+            except sqlite3.Error as e:
+                logger.warning(f"PRAGMA optimize 執行失敗: {e}")
             self.connection.close()
             logger.info("數據庫連接已關閉")
 
 
-# 全局數據庫管理器實例
-db_manager = DatabaseManager()
+class AsyncDatabaseManager:
+    """異步數據庫管理器
+
+    內部持有一個 DatabaseManager，只對外提供 *_async 方法；
+    所有數據庫操作都交由單一工作線程執行，避免 commit() 阻塞事件循環，
+    也避免多個線程的隱式事務與 commit() 在同一連接上交錯。
+    """
+    
+    def __init__(self, db_path: str = None):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._db = DatabaseManager(db_path)
+        self.db_path = self._db.db_path
+    
+    async def _run(self, func, *args, **kwargs):
+        """在數據庫線程中執行同步方法"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+    
+    async def save_funding_rate_async(self, funding_rate_info):
+        return await self._run(self._db.save_funding_rate, funding_rate_info)
+    
+    async def save_arbitrage_opportunity_async(self, opportunity) -> int:
+        return await self._run(self._db.save_arbitrage_opportunity, opportunity)
+    
+    async def save_position_async(self, position_data: Dict) -> bool:
+        return await self._run(self._db.save_position, position_data)
+    
+    async def update_position_async(self, position_id: str, update_data: Dict) -> bool:
+        return await self._run(self._db.update_position, position_id, update_data)
+    
+    async def get_positions_async(self, status: str = None, limit: int = 100) -> List[Dict]:
+        return await self._run(self._db.get_positions, status, limit)
+    
+    async def get_funding_rate_history_async(self, exchange: str, symbol: str, days: int = 7) -> List[Dict]:
+        return await self._run(self._db.get_funding_rate_history, exchange, symbol, days)
+    
+    async def update_daily_stats_async(self, date: datetime, stats: Dict):
+        return await self._run(self._db.update_daily_stats, date, stats)
+    
+    async def get_performance_stats_async(self, days: int = 30) -> Dict:
+        return await self._run(self._db.get_performance_stats, days)
+    
+    async def get_top_performing_symbols_async(self, limit: int = 10) -> List[Dict]:
+        return await self._run(self._db.get_top_performing_symbols, limit)
+    
+    async def update_exchange_status_async(self, exchange: str, status: str, error_message: str = None):
+        return await self._run(self._db.update_exchange_status, exchange, status, error_message)
+    
+    async def cleanup_old_data_async(self, days: int = 30):
+        return await self._run(self._db.cleanup_old_data, days)
+    
+    async def close_async(self):
+        """在數據庫線程中關閉連接並停止線程"""
+        await self._run(self._db.close)
+        self._executor.shutdown(wait=True)
+
+
+# 全局數據庫管理器實例（首次使用時創建）
+_db = None
+_db_lock = threading.Lock()
 
 
 def get_db() -> DatabaseManager:
     """獲取數據庫管理器實例"""
-    return db_manager
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = DatabaseManager()
+    return _db
 
 
 if __name__ == "__main__":
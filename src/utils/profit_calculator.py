@@ -5,16 +5,46 @@
 """
 
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, NamedTuple, Tuple, Optional, Sequence, Union
 from dataclasses import dataclass
+from operator import attrgetter
+import heapq
 import math
+import sys
+import time
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """numba 未安裝時的空裝飾器"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
 
 from config_funding import get_config
 
 config = get_config()
 
+# 年化換算用的每年小時數
+_HOURS_PER_YEAR = 365.0 * 24.0
 
-@dataclass
+# 批量計算中每週期資金費率收益低於此值時視為 0（盈虧平衡週期記為 999）
+_MIN_PERIOD_REVENUE = 1e-18
+
+# 策略排序鍵
+_by_net_profit = attrgetter('net_profit')
+
+# dataclass(slots=True) 需要 Python 3.10+，舊版本退回普通 dataclass
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(frozen=True, **_SLOTS)
 class TradeCalculation:
     """交易計算結果"""
     symbol: str
@@ -46,12 +76,159 @@ class TradeCalculation:
     annualized_return: float
 
 
+@dataclass
+class TradeCalculationBatch:
+    """批量交易計算結果（欄位與 TradeCalculation 對應，每個欄位為一個數組）"""
+    strategy_type: str
+    symbol: np.ndarray
+    position_size_usdt: np.ndarray
+    
+    entry_fee: np.ndarray
+    exit_fee: np.ndarray
+    total_fees: np.ndarray
+    
+    funding_rate_diff: np.ndarray
+    funding_periods: np.ndarray
+    funding_revenue: np.ndarray
+    
+    gross_profit: np.ndarray
+    net_profit: np.ndarray
+    profit_margin: np.ndarray
+    
+    max_loss: np.ndarray
+    risk_reward_ratio: np.ndarray
+    break_even_periods: np.ndarray
+    
+    holding_hours: np.ndarray
+    annualized_return: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.symbol)
+
+
+@njit(cache=True)
+def _cross_core(size, long_taker, short_taker, slippage, long_rate, short_rate, hours):
+    """跨交易所套利數值計算核心
+    
+    返回 (開倉手續費, 總手續費, 滑點成本, 費率差, 週期數, 資金費率收益, 淨利潤,
+          利潤率, 最大虧損, 風險回報比, 盈虧平衡週期, 年化收益率)
+    """
+    long_fee = size * long_taker
+    short_fee = size * short_taker
+    total_fees = long_fee + long_fee + short_fee + short_fee
+    slippage_cost = size * slippage * 2  # 開平倉都有滑點
+    
+    funding_rate_diff = abs(short_rate - long_rate)
+    funding_periods = max(1, int(hours / 8))  # 資金費率每8小時收取一次
+    funding_revenue = size * funding_rate_diff * funding_periods
+    
+    net_profit = funding_revenue - total_fees - slippage_cost
+    profit_margin = (net_profit / size) * 100
+    
+    max_loss = total_fees + slippage_cost + (size * 0.002)  # 2% 價格風險
+    risk_reward_ratio = abs(net_profit / max_loss) if max_loss > 0 else 0.0
+    break_even_periods = math.ceil(total_fees / (size * funding_rate_diff)) if funding_rate_diff > 0 else 999
+    annualized_return = (net_profit / size) * (_HOURS_PER_YEAR / hours) * 100 if hours > 0 else 0.0
+    
+    return (long_fee + short_fee, total_fees, slippage_cost, funding_rate_diff, funding_periods,
+            funding_revenue, net_profit, profit_margin, max_loss, risk_reward_ratio,
+            break_even_periods, annualized_return)
+
+
+@njit(cache=True)
+def _extreme_core(size, taker, slippage, funding_rate, hours):
+    """極端費率套利數值計算核心，返回值順序同 _cross_core"""
+    fee = size * taker  # 期貨、現貨開平倉各一次
+    total_fees = fee + fee + fee + fee
+    slippage_cost = size * slippage * 2
+    
+    funding_rate_abs = abs(funding_rate)
+    funding_periods = max(1, int(hours / 8))
+    funding_revenue = size * funding_rate_abs * funding_periods
+    
+    net_profit = funding_revenue - total_fees - slippage_cost
+    profit_margin = (net_profit / size) * 100
+    
+    basis_risk = size * 0.001  # 0.1% 基差風險
+    max_loss = total_fees + slippage_cost + basis_risk
+    risk_reward_ratio = abs(net_profit / max_loss) if max_loss > 0 else 0.0
+    break_even_periods = math.ceil(total_fees / (size * funding_rate_abs)) if funding_rate != 0 else 999
+    annualized_return = (net_profit / size) * (_HOURS_PER_YEAR / hours) * 100 if hours > 0 else 0.0
+    
+    return (fee + fee, total_fees, slippage_cost, funding_rate_abs, funding_periods,
+            funding_revenue, net_profit, profit_margin, max_loss, risk_reward_ratio,
+            break_even_periods, annualized_return)
+
+
+# calculate_risk_metrics 使用的欄位
+_RISK_FIELDS_DTYPE = np.dtype([
+    ('position_size_usdt', np.float64),
+    ('net_profit', np.float64),
+    ('total_fees', np.float64),
+    ('max_loss', np.float64)
+])
+
+
+# 利潤報告模板（c 為 TradeCalculation）
+_PROFIT_REPORT_TEMPLATE = """
+📊 {c.strategy_type} - 利潤分析報告
+""" + "=" * 50 + """
+
+🎯 基本信息:
+   交易對: {c.symbol}
+   倉位大小: {c.position_size_usdt:,.2f} USDT
+   持倉時間: {c.holding_hours:.1f} 小時
+   資金費率週期: {c.funding_periods} 次
+
+💰 費用分析:
+   開倉手續費: {c.entry_fee:.4f} USDT
+   平倉手續費: {c.exit_fee:.4f} USDT
+   總手續費: {c.total_fees:.4f} USDT
+   手續費率: {fee_pct:.4f}%
+
+📈 收益分析:
+   資金費率差異: {diff_pct:.4f}%
+   資金費率收益: {c.funding_revenue:.4f} USDT
+   毛利潤: {c.gross_profit:.4f} USDT
+   淨利潤: {c.net_profit:.4f} USDT
+   利潤率: {c.profit_margin:.4f}%
+   年化收益率: {c.annualized_return:.2f}%
+
+⚠️  風險分析:
+   最大可能虧損: {c.max_loss:.4f} USDT
+   風險回報比: {c.risk_reward_ratio:.2f}
+   盈虧平衡週期: {c.break_even_periods} 次
+
+📊 投資建議:
+"""
+
+# 策略比較表頭
+_COMPARE_HEADER = (
+    "\n📊 策略比較分析\n"
+    + "=" * 60 + "\n"
+    + f"{'排名':<4} {'策略':<15} {'交易對':<15} {'利潤率':<10} {'風險比':<8}\n"
+    + "-" * 60 + "\n"
+)
+
+
 class ProfitCalculator:
     """利潤計算器"""
     
     def __init__(self):
         self.config = config
         
+        # 手續費率緩存（交易所費率等級最多每小時變動一次）
+        self._default_fee = {'taker': 0.0005}
+        self._fee_rate_cache_ttl = 3600
+        self._commission_rates = self.config.get_commission_rates()
+        self._commission_rates_ts = time.monotonic()
+        
+        # 批量計算用的編碼查找表：交易所/交易對 -> 整數編碼，編碼 0 為未知（默認值）
+        self._ex_idx: Dict[str, int] = {}
+        self._sym_idx: Dict[str, int] = {}
+        self._taker_arr = np.empty(0)
+        self._slip_arr = np.empty(0)
+        
         # 標準資金費率收取週期（小時）
         self.funding_periods = {
             'binance': 8,
@@ -69,6 +246,56 @@ class ProfitCalculator:
             'SOL/USDT:USDT': 0.0005,  # 0.05%
             'default': 0.001          # 0.1% 默認滑點
         }
+        
+        self._build_lookup_tables()
+    
+    def _build_lookup_tables(self):
+        """重建交易所手續費與交易對滑點的數組查找表
+        
+        已分配的編碼保持不變，新出現的名稱追加到末尾，因此調用方緩存的編碼在刷新後仍然有效。
+        """
+        for name in self._commission_rates:
+            self._ex_idx.setdefault(name, len(self._ex_idx) + 1)
+        taker_arr = np.full(len(self._ex_idx) + 1, self._default_fee['taker'])
+        for name, fees in self._commission_rates.items():
+            taker_arr[self._ex_idx[name]] = fees['taker']
+        self._taker_arr = taker_arr
+        
+        for sym in self.slippage_estimates:
+            if sym != 'default':
+                self._sym_idx.setdefault(sym, len(self._sym_idx) + 1)
+        slip_arr = np.full(len(self._sym_idx) + 1, self.slippage_estimates['default'])
+        for sym, idx in self._sym_idx.items():
+            slip_arr[idx] = self.slippage_estimates.get(sym, self.slippage_estimates['default'])
+        self._slip_arr = slip_arr
+    
+    def _get_commission_rates(self) -> Dict[str, Dict[str, float]]:
+        """獲取緩存的手續費率，超過 TTL 後重新讀取配置"""
+        if time.monotonic() - self._commission_rates_ts > self._fee_rate_cache_ttl:
+            self._commission_rates = self.config.get_commission_rates()
+            self._commission_rates_ts = time.monotonic()
+            self._build_lookup_tables()
+        return self._commission_rates
+    
+    def exchange_codes(self, exchanges: Sequence[str]) -> np.ndarray:
+        """將交易所名稱轉換為整數編碼（未知交易所為 0，使用默認手續費）"""
+        return np.fromiter((self._ex_idx.get(ex, 0) for ex in exchanges),
+                           dtype=np.intp, count=len(exchanges))
+    
+    def symbol_codes(self, symbols: Sequence[str]) -> np.ndarray:
+        """將交易對名稱轉換為整數編碼（未知交易對為 0，使用默認滑點）"""
+        return np.fromiter((self._sym_idx.get(sym, 0) for sym in symbols),
+                           dtype=np.intp, count=len(symbols))
+    
+    def _as_exchange_codes(self, exchanges: Union[Sequence[str], np.ndarray]) -> np.ndarray:
+        """已是整數編碼數組時直接使用，否則按名稱轉換"""
+        if isinstance(exchanges, np.ndarray) and exchanges.dtype.kind in 'iu':
+            return exchanges
+        return self.exchange_codes(exchanges)
+    
+    def _fees(self, exchange: str) -> Dict[str, float]:
+        """獲取交易所手續費率"""
+        return self._get_commission_rates().get(exchange, self._default_fee)
     
     def calculate_cross_exchange_arbitrage(
         self,
@@ -82,58 +309,30 @@ class ProfitCalculator:
     ) -> TradeCalculation:
         """計算跨交易所套利利潤"""
         
-        # 獲取手續費率
-        long_fees = self.config.get_commission_rates().get(long_exchange, {'taker': 0.0005})
-        short_fees = self.config.get_commission_rates().get(short_exchange, {'taker': 0.0005})
-        
-        # 計算交易手續費
-        long_entry_fee = position_size_usdt * long_fees['taker']
-        long_exit_fee = position_size_usdt * long_fees['taker']
-        short_entry_fee = position_size_usdt * short_fees['taker']
-        short_exit_fee = position_size_usdt * short_fees['taker']
-        
-        total_fees = long_entry_fee + long_exit_fee + short_entry_fee + short_exit_fee
-        
-        # 計算滑點成本
         slippage = self.slippage_estimates.get(symbol, self.slippage_estimates['default'])
-        slippage_cost = position_size_usdt * slippage * 2  # 開平倉都有滑點
-        
-        # 計算資金費率差異和收益
-        funding_rate_diff = abs(short_funding_rate - long_funding_rate)
-        funding_periods = max(1, int(holding_hours / 8))  # 資金費率每8小時收取一次
-        
-        # 資金費率收益（做多方收取，做空方支付）
-        funding_revenue = position_size_usdt * funding_rate_diff * funding_periods
-        
-        # 計算利潤
-        gross_profit = funding_revenue
-        net_profit = gross_profit - total_fees - slippage_cost
-        profit_margin = (net_profit / position_size_usdt) * 100
         
-        # 風險計算
-        max_loss = total_fees + slippage_cost + (position_size_usdt * 0.002)  # 2% 價格風險
-        risk_reward_ratio = abs(net_profit / max_loss) if max_loss > 0 else 0
-        
-        # 盈虧平衡計算
-        break_even_periods = math.ceil(total_fees / (position_size_usdt * funding_rate_diff)) if funding_rate_diff > 0 else 999
-        
-        # 年化收益率
-        if holding_hours > 0:
-            annualized_return = (net_profit / position_size_usdt) * (365 * 24 / holding_hours) * 100
-        else:
-            annualized_return = 0
+        (entry_fee, total_fees, _, funding_rate_diff, funding_periods, funding_revenue, net_profit,
+         profit_margin, max_loss, risk_reward_ratio, break_even_periods, annualized_return) = _cross_core(
+            position_size_usdt,
+            self._fees(long_exchange)['taker'],
+            self._fees(short_exchange)['taker'],
+            slippage,
+            long_funding_rate,
+            short_funding_rate,
+            holding_hours
+        )
         
         return TradeCalculation(
             symbol=symbol,
             strategy_type="跨交易所套利",
             position_size_usdt=position_size_usdt,
-            entry_fee=long_entry_fee + short_entry_fee,
-            exit_fee=long_exit_fee + short_exit_fee,
+            entry_fee=entry_fee,
+            exit_fee=entry_fee,
             total_fees=total_fees,
             funding_rate_diff=funding_rate_diff,
             funding_periods=funding_periods,
             funding_revenue=funding_revenue,
-            gross_profit=gross_profit,
+            gross_profit=funding_revenue,
             net_profit=net_profit,
             profit_margin=profit_margin,
             max_loss=max_loss,
@@ -143,6 +342,92 @@ class ProfitCalculator:
             annualized_return=annualized_return
         )
     
+    def calculate_cross_exchange_arbitrage_batch(
+        self,
+        symbols: Sequence[str],
+        long_exchanges: Union[Sequence[str], np.ndarray],
+        short_exchanges: Union[Sequence[str], np.ndarray],
+        long_funding_rates: Sequence[float],
+        short_funding_rates: Sequence[float],
+        position_sizes_usdt: Union[Sequence[float], float],
+        holding_hours: Union[Sequence[float], float] = 8.0
+    ) -> TradeCalculationBatch:
+        """批量計算跨交易所套利利潤（與 calculate_cross_exchange_arbitrage 結果一致）
+        
+        long_exchanges / short_exchanges 可傳入交易所名稱，或 exchange_codes() 預先轉換的整數編碼數組。
+        """
+        
+        n = len(symbols)
+        symbols = np.asarray(symbols, dtype=object)
+        sizes = np.broadcast_to(np.asarray(position_sizes_usdt, dtype=np.float64), (n,))
+        hours_in = np.asarray(holding_hours, dtype=np.float64)
+        hours = np.broadcast_to(hours_in, (n,))
+        long_rates = np.asarray(long_funding_rates, dtype=np.float64)
+        short_rates = np.asarray(short_funding_rates, dtype=np.float64)
+        
+        # 手續費率與滑點：按編碼從查找表中批量取值
+        self._get_commission_rates()
+        long_taker = self._taker_arr[self._as_exchange_codes(long_exchanges)]
+        short_taker = self._taker_arr[self._as_exchange_codes(short_exchanges)]
+        slippage = self._slip_arr[self.symbol_codes(symbols)]
+        
+        # 交易手續費
+        long_fee = sizes * long_taker
+        short_fee = sizes * short_taker
+        entry_fee = long_fee + short_fee
+        exit_fee = entry_fee.copy()
+        total_fees = long_fee + long_fee + short_fee + short_fee
+        
+        # 滑點成本
+        slippage_cost = sizes * slippage * 2
+        
+        # 資金費率差異和收益
+        funding_rate_diff = np.abs(short_rates - long_rates)
+        funding_periods = np.maximum(1, np.trunc(hours / 8).astype(np.int64))
+        funding_revenue = sizes * funding_rate_diff * funding_periods
+        
+        # 利潤
+        gross_profit = funding_revenue
+        net_profit = gross_profit - total_fees - slippage_cost
+        profit_margin = (net_profit / sizes) * 100
+        
+        # 風險
+        max_loss = total_fees + slippage_cost + (sizes * 0.002)
+        risk_reward_ratio = np.zeros(n)
+        np.divide(np.abs(net_profit), max_loss, out=risk_reward_ratio, where=max_loss > 0)
+        
+        # 盈虧平衡週期（每週期收益趨近 0 時為 999，避免極小分母導致整數溢出）
+        denom = sizes * funding_rate_diff
+        break_even = np.full(n, 999.0)
+        np.divide(total_fees, denom, out=break_even, where=denom > _MIN_PERIOD_REVENUE)
+        np.ceil(break_even, out=break_even)
+        break_even_periods = break_even.astype(np.int64)
+        
+        # 年化收益率（年化乘數按傳入的持倉時間計算一次，標量時只算一個值）
+        annual_mult = np.zeros_like(hours_in)
+        np.divide(100.0 * _HOURS_PER_YEAR, hours_in, out=annual_mult, where=hours_in > 0)
+        annualized_return = net_profit / sizes * annual_mult
+        
+        return TradeCalculationBatch(
+            strategy_type="跨交易所套利",
+            symbol=symbols,
+            position_size_usdt=sizes,
+            entry_fee=entry_fee,
+            exit_fee=exit_fee,
+            total_fees=total_fees,
+            funding_rate_diff=funding_rate_diff,
+            funding_periods=funding_periods,
+            funding_revenue=funding_revenue,
+            gross_profit=gross_profit,
+            net_profit=net_profit,
+            profit_margin=profit_margin,
+            max_loss=max_loss,
+            risk_reward_ratio=risk_reward_ratio,
+            break_even_periods=break_even_periods,
+            holding_hours=hours,
+            annualized_return=annualized_return
+        )
+    
     def calculate_extreme_funding_arbitrage(
         self,
         symbol: str,
@@ -153,55 +438,28 @@ class ProfitCalculator:
     ) -> TradeCalculation:
         """計算極端資金費率套利利潤"""
         
-        # 獲取手續費率
-        exchange_fees = self.config.get_commission_rates().get(exchange, {'taker': 0.0005})
-        
-        # 計算交易手續費（期貨 + 現貨）
-        futures_entry_fee = position_size_usdt * exchange_fees['taker']
-        futures_exit_fee = position_size_usdt * exchange_fees['taker'] 
-        spot_entry_fee = position_size_usdt * exchange_fees['taker']
-        spot_exit_fee = position_size_usdt * exchange_fees['taker']
-        
-        total_fees = futures_entry_fee + futures_exit_fee + spot_entry_fee + spot_exit_fee
-        
-        # 計算滑點成本
         slippage = self.slippage_estimates.get(symbol, self.slippage_estimates['default'])
-        slippage_cost = position_size_usdt * slippage * 2
-        
-        # 計算資金費率收益
-        funding_periods = max(1, int(holding_hours / 8))
-        funding_revenue = position_size_usdt * abs(funding_rate) * funding_periods
-        
-        # 計算利潤
-        gross_profit = funding_revenue
-        net_profit = gross_profit - total_fees - slippage_cost
-        profit_margin = (net_profit / position_size_usdt) * 100
-        
-        # 風險計算（現貨期貨價差風險）
-        basis_risk = position_size_usdt * 0.001  # 0.1% 基差風險
-        max_loss = total_fees + slippage_cost + basis_risk
-        risk_reward_ratio = abs(net_profit / max_loss) if max_loss > 0 else 0
         
-        # 盈虧平衡計算
-        break_even_periods = math.ceil(total_fees / (position_size_usdt * abs(funding_rate))) if funding_rate != 0 else 999
-        
-        # 年化收益率
-        if holding_hours > 0:
-            annualized_return = (net_profit / position_size_usdt) * (365 * 24 / holding_hours) * 100
-        else:
-            annualized_return = 0
+        (entry_fee, total_fees, _, funding_rate_abs, funding_periods, funding_revenue, net_profit,
+         profit_margin, max_loss, risk_reward_ratio, break_even_periods, annualized_return) = _extreme_core(
+            position_size_usdt,
+            self._fees(exchange)['taker'],
+            slippage,
+            funding_rate,
+            holding_hours
+        )
         
         return TradeCalculation(
             symbol=symbol,
             strategy_type="極端費率套利",
             position_size_usdt=position_size_usdt,
-            entry_fee=futures_entry_fee + spot_entry_fee,
-            exit_fee=futures_exit_fee + spot_exit_fee,
+            entry_fee=entry_fee,
+            exit_fee=entry_fee,
             total_fees=total_fees,
-            funding_rate_diff=abs(funding_rate),
+            funding_rate_diff=funding_rate_abs,
             funding_periods=funding_periods,
             funding_revenue=funding_revenue,
-            gross_profit=gross_profit,
+            gross_profit=funding_revenue,
             net_profit=net_profit,
             profit_margin=profit_margin,
             max_loss=max_loss,
@@ -239,33 +497,24 @@ class ProfitCalculator:
         symbol: str,
         exchanges: List[str],
         position_size_usdt: float
-    ) -> Dict[str, float]:
+    ) -> Dict[str, Dict[str, float]]:
         """分析不同交易所的手續費影響"""
         
-        fee_analysis = {}
-        commission_rates = self.config.get_commission_rates()
-        
-        for exchange in exchanges:
-            fees = commission_rates.get(exchange, {'taker': 0.0005})
-            
-            # 計算往返交易費用
-            round_trip_fee = position_size_usdt * fees['taker'] * 2
-            
-            # 計算滑點
-            slippage = self.slippage_estimates.get(symbol, self.slippage_estimates['default'])
-            slippage_cost = position_size_usdt * slippage * 2
-            
-            total_cost = round_trip_fee + slippage_cost
-            cost_percentage = (total_cost / position_size_usdt) * 100
-            
-            fee_analysis[exchange] = {
-                'trading_fee': round_trip_fee,
-                'slippage_cost': slippage_cost,
-                'total_cost': total_cost,
-                'cost_percentage': cost_percentage
-            }
-        
-        return fee_analysis
+        self._get_commission_rates()
+        taker = self._taker_arr[self.exchange_codes(exchanges)]
+        
+        # 往返交易費用與滑點（滑點只取決於交易對，對所有交易所相同）
+        round_trip_fee = position_size_usdt * taker * 2
+        slippage = self.slippage_estimates.get(symbol, self.slippage_estimates['default'])
+        slippage_cost = np.full_like(taker, position_size_usdt * slippage * 2)
+        
+        total_cost = round_trip_fee + slippage_cost
+        cost_percentage = (total_cost / position_size_usdt) * 100
+        
+        keys = ('trading_fee', 'slippage_cost', 'total_cost', 'cost_percentage')
+        rows = zip(round_trip_fee.tolist(), slippage_cost.tolist(),
+                   total_cost.tolist(), cost_percentage.tolist())
+        return {exchange: dict(zip(keys, row)) for exchange, row in zip(exchanges, rows)}
     
     def calculate_risk_metrics(
         self,
@@ -277,29 +526,32 @@ class ProfitCalculator:
         if not calculations:
             return {}
         
-        total_exposure = sum(calc.position_size_usdt for calc in calculations)
-        total_profit = sum(calc.net_profit for calc in calculations)
-        total_fees = sum(calc.total_fees for calc in calculations)
+        # 一次取出所需欄位，後續統計均為數組運算
+        arr = np.fromiter(
+            ((c.position_size_usdt, c.net_profit, c.total_fees, c.max_loss) for c in calculations),
+            dtype=_RISK_FIELDS_DTYPE,
+            count=len(calculations)
+        )
+        profits = arr['net_profit']
+        
+        # 四個欄位均為 float64，視為 (n, 4) 矩陣後一次歸約求出全部合計
+        totals = arr.view(np.float64).reshape(-1, len(_RISK_FIELDS_DTYPE)).sum(axis=0)
+        total_exposure, total_profit, total_fees, max_loss = totals.tolist()
         
         # 夏普比率 (簡化版)
-        profits = [calc.net_profit for calc in calculations]
         if len(profits) > 1:
-            avg_profit = sum(profits) / len(profits)
-            profit_std = (sum((p - avg_profit) ** 2 for p in profits) / len(profits)) ** 0.5
-            sharpe_ratio = avg_profit / profit_std if profit_std > 0 else 0
+            profit_std = profits.std()
+            sharpe_ratio = float(profits.mean() / profit_std) if profit_std > 0 else 0
         else:
             sharpe_ratio = 0
         
         # 最大回撤
-        max_loss = sum(calc.max_loss for calc in calculations)
         max_drawdown_pct = (max_loss / portfolio_size) * 100 if portfolio_size > 0 else 0
         
         # 利潤因子
-        winning_trades = [calc for calc in calculations if calc.net_profit > 0]
-        losing_trades = [calc for calc in calculations if calc.net_profit < 0]
-        
-        total_wins = sum(calc.net_profit for calc in winning_trades)
-        total_losses = abs(sum(calc.net_profit for calc in losing_trades))
+        win_mask = profits > 0
+        total_wins = float(profits[win_mask].sum())
+        total_losses = float(-profits[profits < 0].sum())
         profit_factor = total_wins / total_losses if total_losses > 0 else float('inf')
         
         # 資金使用效率
@@ -314,7 +566,7 @@ class ProfitCalculator:
             'max_drawdown_pct': max_drawdown_pct,
             'profit_factor': profit_factor,
             'capital_efficiency': capital_efficiency,
-            'win_rate': len(winning_trades) / len(calculations) * 100,
+            'win_rate': int(win_mask.sum()) / len(calculations) * 100,
             'avg_profit_per_trade': total_profit / len(calculations),
             'exposure_ratio': (total_exposure / portfolio_size) * 100 if portfolio_size > 0 else 0
         }
@@ -325,54 +577,36 @@ class ProfitCalculator:
     ) -> str:
         """生成詳細的利潤報告"""
         
-        report = f"""
-📊 {calculation.strategy_type} - 利潤分析報告
-{'='*50}
-
-🎯 基本信息:
-   交易對: {calculation.symbol}
-   倉位大小: {calculation.position_size_usdt:,.2f} USDT
-   持倉時間: {calculation.holding_hours:.1f} 小時
-   資金費率週期: {calculation.funding_periods} 次
-
-💰 費用分析:
-   開倉手續費: {calculation.entry_fee:.4f} USDT
-   平倉手續費: {calculation.exit_fee:.4f} USDT
-   總手續費: {calculation.total_fees:.4f} USDT
-   手續費率: {(calculation.total_fees/calculation.position_size_usdt)*100:.4f}%
-
-📈 收益分析:
-   資金費率差異: {calculation.funding_rate_diff*100:.4f}%
-   資金費率收益: {calculation.funding_revenue:.4f} USDT
-   毛利潤: {calculation.gross_profit:.4f} USDT
-   淨利潤: {calculation.net_profit:.4f} USDT
-   利潤率: {calculation.profit_margin:.4f}%
-   年化收益率: {calculation.annualized_return:.2f}%
-
-⚠️  風險分析:
-   最大可能虧損: {calculation.max_loss:.4f} USDT
-   風險回報比: {calculation.risk_reward_ratio:.2f}
-   盈虧平衡週期: {calculation.break_even_periods} 次
-
-📊 投資建議:
-"""
+        parts = [_PROFIT_REPORT_TEMPLATE.format(
+            c=calculation,
+            fee_pct=(calculation.total_fees / calculation.position_size_usdt) * 100,
+            diff_pct=calculation.funding_rate_diff * 100
+        )]
         
         # 投資建議
         if calculation.profit_margin > 1.0:
-            report += "   ✅ 建議執行 - 利潤率良好\n"
+            parts.append("   ✅ 建議執行 - 利潤率良好\n")
         elif calculation.profit_margin > 0.5:
-            report += "   ⚠️  謹慎考慮 - 利潤率一般\n"
+            parts.append("   ⚠️  謹慎考慮 - 利潤率一般\n")
         else:
-            report += "   ❌ 不建議執行 - 利潤率偏低\n"
+            parts.append("   ❌ 不建議執行 - 利潤率偏低\n")
         
         if calculation.risk_reward_ratio > 3.0:
-            report += "   ✅ 風險可控 - 風險回報比優秀\n"
+            parts.append("   ✅ 風險可控 - 風險回報比優秀\n")
         elif calculation.risk_reward_ratio > 1.5:
-            report += "   ⚠️  適中風險 - 風險回報比一般\n"
+            parts.append("   ⚠️  適中風險 - 風險回報比一般\n")
         else:
-            report += "   ❌ 風險偏高 - 風險回報比不佳\n"
+            parts.append("   ❌ 風險偏高 - 風險回報比不佳\n")
         
-        return report
+        return "".join(parts)
+    
+    def top_strategies(
+        self,
+        calculations: List[TradeCalculation],
+        k: int = 10
+    ) -> List[TradeCalculation]:
+        """按淨利潤取前 k 個策略（O(N log k)，無需完整排序）"""
+        return heapq.nlargest(k, calculations, key=_by_net_profit)
     
     def compare_strategies(
         self,
@@ -384,33 +618,38 @@ class ProfitCalculator:
             return "❌ 沒有可比較的策略"
         
         # 按淨利潤排序
-        sorted_calcs = sorted(calculations, key=lambda x: x.net_profit, reverse=True)
-        
-        report = "\n📊 策略比較分析\n"
-        report += "="*60 + "\n"
-        report += f"{'排名':<4} {'策略':<15} {'交易對':<15} {'利潤率':<10} {'風險比':<8}\n"
-        report += "-"*60 + "\n"
+        sorted_calcs = sorted(calculations, key=_by_net_profit, reverse=True)
         
+        parts = [_COMPARE_HEADER]
         for i, calc in enumerate(sorted_calcs, 1):
-            report += f"{i:<4} {calc.strategy_type:<15} {calc.symbol:<15} "
-            report += f"{calc.profit_margin:<10.2f}% {calc.risk_reward_ratio:<8.2f}\n"
+            parts.append(f"{i:<4} {calc.strategy_type:<15} {calc.symbol:<15} "
+                         f"{calc.profit_margin:<10.2f}% {calc.risk_reward_ratio:<8.2f}\n")
         
         # 最佳策略推薦
         best = sorted_calcs[0]
-        report += f"\n🏆 推薦策略: {best.strategy_type} - {best.symbol}\n"
-        report += f"   預期利潤: {best.net_profit:.4f} USDT\n"
-        report += f"   利潤率: {best.profit_margin:.2f}%\n"
-        report += f"   風險等級: {'低' if best.risk_reward_ratio > 3 else '中' if best.risk_reward_ratio > 1.5 else '高'}\n"
+        risk_level = '低' if best.risk_reward_ratio > 3 else '中' if best.risk_reward_ratio > 1.5 else '高'
+        parts.append(f"\n🏆 推薦策略: {best.strategy_type} - {best.symbol}\n"
+                     f"   預期利潤: {best.net_profit:.4f} USDT\n"
+                     f"   利潤率: {best.profit_margin:.2f}%\n"
+                     f"   風險等級: {risk_level}\n")
         
-        return report
+        return "".join(parts)
 
 
 # 實用函數
+class QuickEst(NamedTuple):
+    """快速利潤估算結果"""
+    gross_profit: float
+    total_fees: float
+    net_profit: float
+    profit_margin: float
+
+
 def quick_profit_estimate(
     funding_rate_diff: float,
     position_size: float,
     fee_rate: float = 0.001
-) -> Dict[str, float]:
+) -> QuickEst:
     """快速利潤估算"""
     
     gross_profit = position_size * funding_rate_diff
@@ -418,12 +657,7 @@ def quick_profit_estimate(
     net_profit = gross_profit - total_fees
     profit_margin = (net_profit / position_size) * 100
     
-    return {
-        'gross_profit': gross_profit,
-        'total_fees': total_fees,
-        'net_profit': net_profit,
-        'profit_margin': profit_margin
-    }
+    return QuickEst(gross_profit, total_fees, net_profit, profit_margin)
 
 
 def calculate_minimum_spread(
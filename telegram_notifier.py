@@ -8,14 +8,111 @@ import asyncio
 import aiohttp
 import json
 import logging
+import time
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 
 from config_funding import get_config
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    try:
+        import ujson as _json_fallback
+    except ImportError:
+        _json_fallback = json
+
 logger = logging.getLogger("TelegramNotifier")
 
+# Telegram 單條消息上限 4096 字符，合併時預留餘量
+MAX_BATCH_CHARS = 4000
+BATCH_SEPARATOR = "\n\n---\n\n"
+
+# 發送速率限制（Telegram 對單個聊天約每秒 1 條，允許短暫突發）
+RATE_LIMIT_PER_SEC = 1.0
+RATE_LIMIT_BURST = 3
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# HTML parse_mode 下需要轉義的字符
+_HTML_TRANS = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+
+# 預先定義的消息模板（__init__ 中綁定 str.format，避免每次通知重新拼接）
+MESSAGE_TEMPLATE = "{e} <b>{t}</b>\n\n{c}\n\n🕐 時間: {ts}"
+
+OPPORTUNITY_TEMPLATE = """
+💰 <b>預期8h利潤:</b> {profit:.2f} USDT
+📊 <b>交易對:</b> {symbol}
+🏪 <b>交易所:</b> {primary_ex} ↔️ {secondary_ex}
+🎯 <b>可信度:</b> {confidence:.1%}
+📈 <b>策略:</b> {strategy}
+
+💡 <i>請及時關注市場變化，適時進場！</i>
+"""
+
+TRADE_TEMPLATE = """
+📊 <b>交易對:</b> {symbol}
+🏪 <b>交易所:</b> {exchange}
+📏 <b>數量:</b> {size}
+💲 <b>價格:</b> {price}
+⏰ <b>執行時間:</b> {time}
+"""
+
+SYSTEM_TEMPLATE = """
+📊 <b>狀態:</b> {status}
+{details}
+"""
+
+DAILY_TEMPLATE = """
+💰 <b>總利潤:</b> {total_profit:.2f} USDT
+📈 <b>成功交易:</b> {successful_trades}
+📉 <b>失敗交易:</b> {failed_trades}
+🎯 <b>成功率:</b> {success_rate:.1%}
+🔍 <b>發現機會:</b> {opportunities_found}
+📊 <b>活躍倉位:</b> {active_positions}
+
+{remark}
+"""
+
+ERROR_TEMPLATE = """
+🚨 <b>錯誤信息:</b> {error_msg}
+{details}
+⏰ <b>發生時間:</b> {time}
+
+🔧 <i>請檢查系統狀態並及時處理</i>
+"""
+
+POSITION_TEMPLATE = """
+📈 <b>交易對:</b> {symbol}
+💰 <b>盈虧:</b> {profit:+.2f} USDT
+🎯 <b>操作:</b> {action}
+⏰ <b>時間:</b> {time}
+"""
+
+# 秒級緩存的當前時間字符串 [秒, 格式化結果]，同一秒內的通知共用一次 strftime
+_last_ts = [0, ""]
+
+def _now_str() -> str:
+    """返回當前時間 "%Y-%m-%d %H:%M:%S"，每秒最多格式化一次"""
+    t = int(time.time())
+    if t != _last_ts[0]:
+        _last_ts[0] = t
+        _last_ts[1] = datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M:%S")
+    return _last_ts[1]
+
+def _esc(value: Any) -> str:
+    """轉義插入 HTML 消息的動態內容"""
+    return str(value).translate(_HTML_TRANS)
+
+def _encode_json(obj: Any) -> bytes:
+    """序列化請求體（orjson 直接輸出 bytes，省去 str 與 bytes 間的往返轉換）"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return _json_fallback.dumps(obj).encode()
+
 @dataclass
 class NotificationMessage:
     """通知消息結構"""
@@ -31,13 +128,33 @@ class NotificationMessage:
 class TelegramNotifier:
     """Telegram 通知器"""
     
-    def __init__(self, bot_token: str = None, chat_id: str = None):
-        self.config = get_config()
-        self.bot_token = bot_token or self.config.system.telegram_bot_token
-        self.chat_id = chat_id or self.config.system.telegram_chat_id
-        self.enabled = self.config.system.enable_telegram_alerts
+    def __init__(self, bot_token: str = None, chat_id: str = None, enabled: bool = None):
+        if enabled is False:
+            # 明確停用時不讀取配置（模塊導入時創建的全局實例）
+            self.config = None
+            self.bot_token = bot_token or ""
+            self.chat_id = chat_id or ""
+            self.enabled = False
+        else:
+            self.config = get_config()
+            self.bot_token = bot_token or self.config.system.telegram_bot_token
+            self.chat_id = chat_id or self.config.system.telegram_chat_id
+            self.enabled = self.config.system.enable_telegram_alerts if enabled is None else enabled
         self.session = None
         
+        # 批量發送隊列（首次以 batch=True 發送時創建，綁定當前事件循環）
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer_task: Optional[asyncio.Task] = None
+        
+        # 令牌桶：在觸發 429 之前主動限速
+        self._tokens = float(RATE_LIMIT_BURST)
+        self._last_refill = time.monotonic()
+        
+        # 預先拼接 API 地址
+        self._api_base = f"https://api.telegram.org/bot{self.bot_token}"
+        self._send_url = f"{self._api_base}/sendMessage"
+        self._get_me_url = f"{self._api_base}/getMe"
+        
         # 表情符號映射
         self.emoji_map = {
             "info": "ℹ️",
@@ -50,6 +167,23 @@ class TelegramNotifier:
             "alert": "🚨"
         }
         
+        # 熱路徑直接讀取屬性，不再查字典
+        self._warning_emoji = self.emoji_map["warning"]
+        self._error_emoji = self.emoji_map["error"]
+        self._success_emoji = self.emoji_map["success"]
+        self._profit_emoji = self.emoji_map["profit"]
+        self._trade_emoji = self.emoji_map["trade"]
+        self._system_emoji = self.emoji_map["system"]
+        
+        # 綁定模板的 format 方法
+        self._message_tmpl = MESSAGE_TEMPLATE.format
+        self._opportunity_tmpl = OPPORTUNITY_TEMPLATE.format
+        self._trade_tmpl = TRADE_TEMPLATE.format
+        self._system_tmpl = SYSTEM_TEMPLATE.format
+        self._daily_tmpl = DAILY_TEMPLATE.format
+        self._error_tmpl = ERROR_TEMPLATE.format
+        self._position_tmpl = POSITION_TEMPLATE.format
+        
         if self.enabled and (not self.bot_token or not self.chat_id):
             logger.warning("Telegram 通知已啟用但缺少 Bot Token 或 Chat ID")
             self.enabled = False
@@ -57,227 +191,289 @@ class TelegramNotifier:
     async def initialize(self):
         """初始化會話"""
         if self.enabled:
-            self.session = aiohttp.ClientSession()
+            # 所有通知共用一個會話，保持連接避免每次重新 TLS 握手
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=4,
+                    limit_per_host=4,
+                    keepalive_timeout=75,
+                    ttl_dns_cache=300
+                ),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
             await self.test_connection()
     
     async def close(self):
-        """關閉會話"""
+        """關閉會話（先發送隊列中剩餘的消息）"""
+        if self._consumer_task:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=10)
+            except asyncio.TimeoutError:
+                logger.warning("關閉時仍有 %d 條 Telegram 消息未發送", self._queue.qsize())
+            self._consumer_task.cancel()
+            try:
+                await self._consumer_task
+            except asyncio.CancelledError:
+                pass
+            self._consumer_task = None
+            self._queue = None
         if self.session:
             await self.session.close()
+            self.session = None
     
     async def test_connection(self) -> bool:
         """測試 Telegram Bot 連接"""
         try:
-            url = f"https://api.telegram.org/bot{self.bot_token}/getMe"
-            async with self.session.get(url) as response:
+            async with self.session.get(self._get_me_url) as response:
                 if response.status == 200:
                     data = await response.json()
                     if data.get('ok'):
                         bot_info = data.get('result', {})
-                        logger.info(f"Telegram Bot 連接成功: {bot_info.get('username')}")
+                        logger.info("Telegram Bot 連接成功: %s", bot_info.get('username'))
                         return True
                 else:
-                    logger.error(f"Telegram Bot 連接失敗: HTTP {response.status}")
+                    logger.error("Telegram Bot 連接失敗: HTTP %s", response.status)
                     return False
         except Exception as e:
-            logger.error(f"測試 Telegram 連接時出錯: {e}")
+            logger.error("測試 Telegram 連接時出錯: %s", e)
             return False
     
-    async def send_message(self, message: str, parse_mode: str = "HTML") -> bool:
-        """發送消息到 Telegram"""
-        if not self.enabled or not self.session:
+    async def send_message(self, message: str, parse_mode: str = "HTML",
+                           silent: bool = False, batch: bool = False) -> bool:
+        """發送消息到 Telegram
+        
+        默認直接發送，返回值表示是否發送成功。
+        batch 為 True 時消息加入隊列，由後台任務與其他積壓消息合併後發送，
+        此時返回 True 僅表示已入隊、不代表已送達；使用批量發送後需調用 close() 發送剩餘消息。
+        silent 為 True 時以靜音方式發送（disable_notification），用於非緊急通知
+        直接發送受令牌桶限速，突發超過 RATE_LIMIT_BURST 條時調用方會等待
+        """
+        if not self.enabled or not self.session or self.session.closed:
             return False
         
+        if not batch:
+            await self._acquire_token()
+            return await self._post_message(message, parse_mode, silent)
+        
+        if self._consumer_task is None:
+            self._queue = asyncio.Queue()
+            self._consumer_task = asyncio.create_task(self._consumer())
+        await self._queue.put((message, parse_mode, silent))
+        return True
+    
+    async def _consumer(self):
+        """後台發送任務：取出隊列中已積壓的全部消息，合併後批量發送"""
+        while True:
+            items = [await self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            
+            try:
+                for message, parse_mode, silent in self._coalesce(items):
+                    await self._acquire_token()
+                    await self._post_message(message, parse_mode, silent)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+    
+    @staticmethod
+    def _coalesce(items: List[tuple]) -> List[tuple]:
+        """將相同 parse_mode 的相鄰消息合併，單條不超過 MAX_BATCH_CHARS
+        
+        合併後只要包含一條非靜音消息，整批即以非靜音方式發送
+        """
+        batches = []
+        for message, parse_mode, silent in items:
+            if batches:
+                last_message, last_mode, last_silent = batches[-1]
+                if (last_mode == parse_mode and
+                        len(last_message) + len(BATCH_SEPARATOR) + len(message) <= MAX_BATCH_CHARS):
+                    batches[-1] = (last_message + BATCH_SEPARATOR + message, parse_mode,
+                                   last_silent and silent)
+                    continue
+            batches.append((message, parse_mode, silent))
+        return batches
+    
+    async def _acquire_token(self):
+        """令牌桶限速：令牌不足時等待補充
+
+        先扣除令牌再等待（允許為負），並發調用者依次排到各自的發送時刻，
+        不會在同一時刻一起醒來後同時發送
+        """
+        now = time.monotonic()
+        self._tokens = min(RATE_LIMIT_BURST,
+                           self._tokens + (now - self._last_refill) * RATE_LIMIT_PER_SEC)
+        self._last_refill = now
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / RATE_LIMIT_PER_SEC)
+    
+    async def _post_message(self, message: str, parse_mode: str, silent: bool = False) -> bool:
+        """發送單條消息到 Telegram"""
         try:
-            url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
             payload = {
                 "chat_id": self.chat_id,
                 "text": message,
                 "parse_mode": parse_mode,
-                "disable_web_page_preview": True
+                "disable_web_page_preview": True,
+                "disable_notification": silent
             }
             
-            async with self.session.post(url, json=payload) as response:
+            async with self.session.post(self._send_url, data=_encode_json(payload),
+                                         headers=_JSON_HEADERS) as response:
                 if response.status == 200:
                     return True
                 else:
                     error_text = await response.text()
-                    logger.error(f"發送 Telegram 消息失敗: {error_text}")
+                    logger.error("發送 Telegram 消息失敗: %s", error_text)
                     return False
         except Exception as e:
-            logger.error(f"發送 Telegram 消息時出錯: {e}")
+            logger.error("發送 Telegram 消息時出錯: %s", e)
             return False
     
     def format_message(self, notification: NotificationMessage) -> str:
         """格式化通知消息"""
-        emoji = self.emoji_map.get(notification.level, "📢")
-        timestamp = notification.timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        
-        message = f"{emoji} <b>{notification.title}</b>\n\n"
-        message += f"{notification.content}\n\n"
-        message += f"🕐 時間: {timestamp}"
-        
-        return message
+        return self._message_tmpl(
+            e=self.emoji_map.get(notification.level, "📢"),
+            t=notification.title,
+            c=notification.content,
+            ts=notification.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        )
     
-    async def notify_arbitrage_opportunity(self, opportunity: Dict[str, Any]) -> bool:
-        """發送套利機會通知"""
+    def _render(self, emoji: str, title: str, content: str, ts: str) -> str:
+        """按預綁定模板生成消息（等價於 format_message，省去中間對象）"""
+        return self._message_tmpl(e=emoji, t=title, c=content, ts=ts)
+    
+    async def notify_arbitrage_opportunity(self, opportunity: Dict[str, Any],
+                                           batch: bool = False) -> bool:
+        """發送套利機會通知
+        
+        掃描時一次發現多個機會可傳入 batch=True，消息入隊合併發送，不等待 Telegram 響應
+        """
         if not self.enabled:
             return False
         
-        profit = opportunity.get('estimated_profit_8h', 0)
-        symbol = opportunity.get('symbol', 'Unknown')
-        primary_ex = opportunity.get('primary_exchange', '').upper()
-        secondary_ex = opportunity.get('secondary_exchange', '').upper()
-        confidence = opportunity.get('confidence_score', 0)
-        
-        title = f"🎯 套利機會發現 - {symbol}"
-        content = f"""
-💰 <b>預期8h利潤:</b> {profit:.2f} USDT
-📊 <b>交易對:</b> {symbol}
-🏪 <b>交易所:</b> {primary_ex} ↔️ {secondary_ex}
-🎯 <b>可信度:</b> {confidence:.1%}
-📈 <b>策略:</b> {opportunity.get('strategy_type', '跨交易所套利')}
-
-💡 <i>請及時關注市場變化，適時進場！</i>
-"""
-        
-        notification = NotificationMessage(
-            title=title,
-            content=content,
-            level="profit"
+        symbol = _esc(opportunity.get('symbol', 'Unknown'))
+        content = self._opportunity_tmpl(
+            profit=opportunity.get('estimated_profit_8h', 0),
+            symbol=symbol,
+            primary_ex=_esc(opportunity.get('primary_exchange', '').upper()),
+            secondary_ex=_esc(opportunity.get('secondary_exchange', '').upper()),
+            confidence=opportunity.get('confidence_score', 0),
+            strategy=_esc(opportunity.get('strategy_type', '跨交易所套利'))
         )
         
-        return await self.send_message(self.format_message(notification))
+        message = self._render(self._profit_emoji, f"🎯 套利機會發現 - {symbol}",
+                               content, _now_str())
+        return await self.send_message(message, batch=batch)
     
     async def notify_trade_execution(self, trade_info: Dict[str, Any]) -> bool:
         """發送交易執行通知"""
         if not self.enabled:
             return False
         
+        now = _now_str()
         action = trade_info.get('action', 'Unknown')
-        symbol = trade_info.get('symbol', 'Unknown')
-        exchange = trade_info.get('exchange', '').upper()
-        size = trade_info.get('size', 0)
-        price = trade_info.get('price', 0)
-        
-        title = f"📈 交易執行 - {action.upper()}"
-        content = f"""
-📊 <b>交易對:</b> {symbol}
-🏪 <b>交易所:</b> {exchange}
-📏 <b>數量:</b> {size}
-💲 <b>價格:</b> {price}
-⏰ <b>執行時間:</b> {datetime.now().strftime('%H:%M:%S')}
-"""
-        
-        notification = NotificationMessage(
-            title=title,
-            content=content,
-            level="trade"
+        content = self._trade_tmpl(
+            symbol=_esc(trade_info.get('symbol', 'Unknown')),
+            exchange=_esc(trade_info.get('exchange', '').upper()),
+            size=_esc(trade_info.get('size', 0)),
+            price=_esc(trade_info.get('price', 0)),
+            time=now[11:]
         )
         
-        return await self.send_message(self.format_message(notification))
+        message = self._render(self._trade_emoji, f"📈 交易執行 - {_esc(action.upper())}",
+                               content, now)
+        return await self.send_message(message)
     
     async def notify_system_status(self, status: str, details: str = "") -> bool:
         """發送系統狀態通知"""
         if not self.enabled:
             return False
         
-        title = f"🔧 系統狀態更新"
-        content = f"""
-📊 <b>狀態:</b> {status}
-{f'📝 <b>詳情:</b> {details}' if details else ''}
-"""
-        
-        notification = NotificationMessage(
-            title=title,
-            content=content,
-            level="system"
+        content = self._system_tmpl(
+            status=_esc(status),
+            details=f'📝 <b>詳情:</b> {_esc(details)}' if details else ''
         )
         
-        return await self.send_message(self.format_message(notification))
+        message = self._render(self._system_emoji, "🔧 系統狀態更新", content, _now_str())
+        return await self.send_message(message, silent=True)
     
     async def notify_daily_summary(self, summary: Dict[str, Any]) -> bool:
         """發送每日摘要通知"""
         if not self.enabled:
             return False
         
-        title = "📊 每日交易摘要"
-        content = f"""
-💰 <b>總利潤:</b> {summary.get('total_profit', 0):.2f} USDT
-📈 <b>成功交易:</b> {summary.get('successful_trades', 0)}
-📉 <b>失敗交易:</b> {summary.get('failed_trades', 0)}
-🎯 <b>成功率:</b> {summary.get('success_rate', 0):.1%}
-🔍 <b>發現機會:</b> {summary.get('opportunities_found', 0)}
-📊 <b>活躍倉位:</b> {summary.get('active_positions', 0)}
-
-{'🎉 <i>今日表現優異！</i>' if summary.get('total_profit', 0) > 0 else '⚠️ <i>注意風險控制</i>'}
-"""
-        
-        notification = NotificationMessage(
-            title=title,
-            content=content,
-            level="success" if summary.get('total_profit', 0) > 0 else "warning"
+        total_profit = summary.get('total_profit', 0)
+        positive = total_profit > 0
+        content = self._daily_tmpl(
+            total_profit=total_profit,
+            successful_trades=summary.get('successful_trades', 0),
+            failed_trades=summary.get('failed_trades', 0),
+            success_rate=summary.get('success_rate', 0),
+            opportunities_found=summary.get('opportunities_found', 0),
+            active_positions=summary.get('active_positions', 0),
+            remark='🎉 <i>今日表現優異！</i>' if positive else '⚠️ <i>注意風險控制</i>'
         )
         
-        return await self.send_message(self.format_message(notification))
+        emoji = self._success_emoji if positive else self._warning_emoji
+        message = self._render(emoji, "📊 每日交易摘要", content, _now_str())
+        return await self.send_message(message)
     
     async def notify_error(self, error_msg: str, details: str = "") -> bool:
         """發送錯誤通知"""
         if not self.enabled:
             return False
         
-        title = "❌ 系統錯誤"
-        content = f"""
-🚨 <b>錯誤信息:</b> {error_msg}
-{f'📝 <b>詳細信息:</b> {details}' if details else ''}
-⏰ <b>發生時間:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-🔧 <i>請檢查系統狀態並及時處理</i>
-"""
-        
-        notification = NotificationMessage(
-            title=title,
-            content=content,
-            level="error"
+        now = _now_str()
+        content = self._error_tmpl(
+            error_msg=_esc(error_msg),
+            details=f'📝 <b>詳細信息:</b> {_esc(details)}' if details else '',
+            time=now
         )
         
-        return await self.send_message(self.format_message(notification))
+        message = self._render(self._error_emoji, "❌ 系統錯誤", content, now)
+        return await self.send_message(message)
     
     async def notify_position_update(self, position_info: Dict[str, Any]) -> bool:
         """發送倉位更新通知"""
         if not self.enabled:
             return False
         
+        now = _now_str()
         action = position_info.get('action', 'Unknown')
-        symbol = position_info.get('symbol', 'Unknown')
         profit = position_info.get('profit', 0)
-        
-        title = f"📊 倉位更新 - {action.upper()}"
-        content = f"""
-📈 <b>交易對:</b> {symbol}
-💰 <b>盈虧:</b> {profit:+.2f} USDT
-🎯 <b>操作:</b> {action}
-⏰ <b>時間:</b> {datetime.now().strftime('%H:%M:%S')}
-"""
-        
-        notification = NotificationMessage(
-            title=title,
-            content=content,
-            level="success" if profit > 0 else "warning"
+        content = self._position_tmpl(
+            symbol=_esc(position_info.get('symbol', 'Unknown')),
+            profit=profit,
+            action=_esc(action),
+            time=now[11:]
         )
         
-        return await self.send_message(self.format_message(notification))
+        emoji = self._success_emoji if profit > 0 else self._warning_emoji
+        message = self._render(emoji, f"📊 倉位更新 - {_esc(action.upper())}", content, now)
+        return await self.send_message(message)
 
-# 全局通知器實例
-_notifier = None
+# 全局通知器實例：導入時綁定一個停用的實例（不讀取配置），
+# 便捷函數直接調用，首次 get_notifier() / initialize_notifier() 時替換為按配置創建的實例
+_DISABLED_NOTIFIER = TelegramNotifier(enabled=False)
+_notifier: TelegramNotifier = _DISABLED_NOTIFIER
 
 def get_notifier() -> TelegramNotifier:
     """獲取全局通知器實例"""
     global _notifier
-    if _notifier is None:
+    if _notifier is _DISABLED_NOTIFIER:
         _notifier = TelegramNotifier()
     return _notifier
 
+def set_notifier(notifier: TelegramNotifier):
+    """替換全局通知器實例（用於測試或自定義配置）"""
+    global _notifier
+    _notifier = notifier
+
 async def initialize_notifier():
     """初始化通知器"""
     notifier = get_notifier()
@@ -285,20 +481,17 @@ async def initialize_notifier():
     return notifier
 
 # 便捷函數
-async def notify_opportunity(opportunity: Dict[str, Any]) -> bool:
+async def notify_opportunity(opportunity: Dict[str, Any], batch: bool = False) -> bool:
     """發送套利機會通知（便捷函數）"""
-    notifier = get_notifier()
-    return await notifier.notify_arbitrage_opportunity(opportunity)
+    return await _notifier.notify_arbitrage_opportunity(opportunity, batch=batch)
 
 async def notify_trade(trade_info: Dict[str, Any]) -> bool:
     """發送交易通知（便捷函數）"""
-    notifier = get_notifier()
-    return await notifier.notify_trade_execution(trade_info)
+    return await _notifier.notify_trade_execution(trade_info)
 
 async def notify_error(error_msg: str, details: str = "") -> bool:
     """發送錯誤通知（便捷函數）"""
-    notifier = get_notifier()
-    return await notifier.notify_error(error_msg, details)
+    return await _notifier.notify_error(error_msg, details)
 
 if __name__ == "__main__":
     # 測試通知功能
@@ -6,19 +6,154 @@
 
 import asyncio
 import aiohttp
+import functools
 import json
 import base64
 import time
+from binascii import b2a_base64
 import os
 from nacl.signing import SigningKey
+from nacl.bindings import crypto_sign
 from nacl.encoding import Base64Encoder
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _json_loads(data):
+    """解析 JSON（orjson 可直接解析 bytes，無需先解碼為 str）"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(data, pretty: bool = False) -> str:
+    """輸出 JSON 字符串，pretty 為 True 時縮進格式化"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0).decode()
+    return json.dumps(data, indent=2 if pretty else None)
+
+
+# 需要簽名的查詢端點: (指令, 路徑)
+SIGNED_ENDPOINTS = [
+    ("balanceQuery", "/api/v1/capital"),
+    ("collateralQuery", "/api/v1/capital/collateral"),
+    ("orderQueryAll", "/api/v1/orders"),
+    ("positionQuery", "/api/v1/position"),
+]
+
+# get_all 的最大並發請求數
+MAX_CONCURRENT_REQUESTS = 4
+
+# 非詳細模式下原始數據超過此項數時只輸出摘要
+MAX_RAW_ITEMS = 100
+
+
+def _load_env_file(path: str = ".env") -> dict:
+    """解析 .env 文件為字典（文件不存在時返回空字典）"""
+    env = {}
+    if not os.path.exists(path):
+        return env
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            env[key.strip()] = value.strip()
+    return env
+
+
+def _load_config_file(path: str = "config.json") -> dict:
+    """讀取並解析 config.json"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _safe_mtime(path: str) -> float:
+    """返回文件修改時間，文件不存在時返回 0"""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0
+
+
+@functools.lru_cache(maxsize=4)
+def _discover_credentials(env_mtime: float, cfg_mtime: float) -> tuple:
+    """從 config.json 或 .env 文件查找 API 憑證
+    
+    以兩個文件的修改時間作為緩存鍵：文件未變動時不再讀取，修改後自動重新查找
+    """
+    # 方式2: config.json 文件
+    try:
+        config = _load_config_file()
+        backpack_config = config.get('exchanges', {}).get('backpack', {})
+        api_key = backpack_config.get('api_key')
+        secret_key = backpack_config.get('secret_key')
+        
+        if api_key and secret_key and api_key != 'BACKPACK_API_KEY':
+            print("📡 從 config.json 獲取 API 憑證")
+            return api_key, secret_key
+    except Exception as e:
+        print(f"⚠️  讀取 config.json 失敗: {e}")
+    
+    # 方式3: .env 文件
+    try:
+        env = _load_env_file()
+        api_key = env.get('BACKPACK_API_KEY')
+        secret_key = env.get('BACKPACK_SECRET_KEY')
+        
+        if api_key and secret_key:
+            print("📡 從 .env 文件獲取 API 憑證")
+            return api_key, secret_key
+    except Exception as e:
+        print(f"⚠️  讀取 .env 文件失敗: {e}")
+    
+    # 所有方式都失敗，返回 None
+    print("❌ 無法從任何來源獲取 API 憑證")
+    print("📝 請使用以下任一方式配置:")
+    print("   1. 設置環境變數: BACKPACK_API_KEY, BACKPACK_SECRET_KEY")
+    print("   2. 修改 config.json 中的 backpack 配置")
+    print("   3. 創建 .env 文件並配置憑證")
+    
+    return None, None
+
+
+def _is_real(asset: str, details) -> bool:
+    """判斷是否為數量大於 0 的真實資產（POINTS 除外）"""
+    if asset == "POINTS":
+        return False
+    try:
+        if isinstance(details, dict):
+            return (float(details.get('available', 0)) + float(details.get('locked', 0))) > 0
+        if isinstance(details, (int, float, str)):
+            return float(details) > 0
+    except (TypeError, ValueError):
+        pass
+    return False
+
+
 class MMSimpleBackpackTest:
     """使用 MM-Simple 方式測試 Backpack 資產獲取"""
     
     def __init__(self):
         self.base_url = "https://api.backpack.exchange"
         self.signing_key = None
+        self.session = None
+        # 詳細輸出（請求、響應、簽名內容），可通過 MMSIMPLE_VERBOSE=1 或 --verbose 開啟
+        self.verbose = os.getenv("MMSIMPLE_VERBOSE", "").strip().lower() in ("1", "true", "yes", "on")
+        
+        # 簽名窗口固定不變，預先生成字符串與 bytes 後綴
+        self._window = "5000"
+        self._window_suffix = b"&window=" + self._window.encode()
+        # 無參數指令的簽名前綴（其他指令首次使用時生成並緩存）
+        self._prefixes = {
+            "balanceQuery": b"instruction=balanceQuery&timestamp=",
+            "collateralQuery": b"instruction=collateralQuery&timestamp=",
+        }
         
         # 嘗試多種方式獲取 API 憑證
         self.api_key, self.secret_key = self._get_api_credentials()
@@ -31,17 +166,47 @@ class MMSimpleBackpackTest:
             print("   3. .env 文件配置")
             return
         
+        # 每個請求都相同的標頭，按請求只補充簽名相關欄位
+        self._base_headers = {"X-API-KEY": self.api_key, "Content-Type": "application/json"}
+        
         print(f"✅ API Key: {self.api_key[:8]}...")
         print(f"✅ Secret Key: {self.secret_key[:8]}...")
         
         # 初始化簽名密鑰
         try:
-            self.signing_key = SigningKey(base64.b64decode(self.secret_key))
+            seed = base64.b64decode(self.secret_key)
+            self.signing_key = SigningKey(seed)
+            # crypto_sign 使用的 64 字節私鑰（種子 + 公鑰），直接返回原始 bytes，
+            # 省去 SignedMessage 對象的構造
+            self._sk_bytes = seed + self.signing_key.verify_key.encode()
+            self._sign_fn = functools.partial(crypto_sign, sk=self._sk_bytes)
             print("✅ ED25519 簽名密鑰初始化成功")
         except Exception as e:
             print(f"❌ 簽名密鑰初始化失敗: {e}")
             self.signing_key = None
     
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        """獲取共用會話，不存在時創建；所有請求復用同一連接池（避免每次重新 TLS 握手）"""
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                base_url=self.base_url,
+                connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300, keepalive_timeout=75)
+            )
+        return self.session
+    
+    async def close(self):
+        """關閉共用會話（未使用 async with 時需手動調用）"""
+        if self.session:
+            await self.session.close()
+            self.session = None
+    
+    async def __aenter__(self):
+        self._ensure_session()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
     def _get_api_credentials(self):
         """嘗試多種方式獲取 API 憑證"""
         
@@ -53,45 +218,8 @@ class MMSimpleBackpackTest:
             print("📡 從環境變數獲取 API 憑證")
             return api_key, secret_key
         
-        # 方式2: config.json 文件
-        try:
-            with open('config.json', 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                backpack_config = config.get('exchanges', {}).get('backpack', {})
-                api_key = backpack_config.get('api_key')
-                secret_key = backpack_config.get('secret_key')
-                
-                if api_key and secret_key and api_key != 'BACKPACK_API_KEY':
-                    print("📡 從 config.json 獲取 API 憑證")
-                    return api_key, secret_key
-        except Exception as e:
-            print(f"⚠️  讀取 config.json 失敗: {e}")
-        
-                 # 方式3: .env 文件
-        try:
-            if os.path.exists('.env'):
-                with open('.env', 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line.startswith('BACKPACK_API_KEY='):
-                            api_key = line.split('=', 1)[1].strip()
-                        elif line.startswith('BACKPACK_SECRET_KEY='):
-                            secret_key = line.split('=', 1)[1].strip()
-                
-                if api_key and secret_key:
-                    print("📡 從 .env 文件獲取 API 憑證")
-                    return api_key, secret_key
-        except Exception as e:
-            print(f"⚠️  讀取 .env 文件失敗: {e}")
-        
-        # 所有方式都失敗，返回 None
-        print("❌ 無法從任何來源獲取 API 憑證")
-        print("📝 請使用以下任一方式配置:")
-        print("   1. 設置環境變數: BACKPACK_API_KEY, BACKPACK_SECRET_KEY")
-        print("   2. 修改 config.json 中的 backpack 配置")
-        print("   3. 創建 .env 文件並配置憑證")
-        
-        return None, None
+        # 方式2、3: config.json / .env 文件（按修改時間緩存）
+        return _discover_credentials(_safe_mtime('.env'), _safe_mtime('config.json'))
     
     def create_signature(self, instruction: str, params: dict = None) -> tuple:
         """創建 MM-Simple 風格的簽名"""
@@ -99,22 +227,26 @@ class MMSimpleBackpackTest:
             return None, None, None
         
         try:
-            timestamp = str(int(time.time() * 1000))
-            window = "5000"
+            timestamp = str(time.time_ns() // 1_000_000)
+            window = self._window
             
-            # 構建簽名字符串
-            if params:
-                query_string = "&".join([f"{k}={v}" for k, v in sorted(params.items())])
-                message = f"instruction={instruction}&{query_string}&timestamp={timestamp}&window={window}"
+            # 構建簽名字符串（無參數時直接拼接預生成的 bytes 前綴，跳過排序與格式化）
+            if not params:
+                prefix = self._prefixes.get(instruction)
+                if prefix is None:
+                    prefix = self._prefixes[instruction] = f"instruction={instruction}&timestamp=".encode()
+                message = prefix + timestamp.encode() + self._window_suffix
             else:
-                message = f"instruction={instruction}&timestamp={timestamp}&window={window}"
+                query_string = "&".join([f"{k}={v}" for k, v in sorted(params.items())])
+                message = f"instruction={instruction}&{query_string}&timestamp={timestamp}&window={window}".encode()
             
             # 簽名
-            signature_bytes = self.signing_key.sign(message.encode()).signature
-            signature = base64.b64encode(signature_bytes).decode()
+            signature_bytes = self._sign_fn(message)[:64]
+            signature = b2a_base64(signature_bytes, newline=False).decode('ascii')
             
-            print(f"🔐 簽名訊息: {message}")
-            print(f"🔐 生成簽名: {signature[:20]}...")
+            if self.verbose:
+                print(f"🔐 簽名訊息: {message.decode()}")
+                print(f"🔐 生成簽名: {signature[:20]}...")
             
             return signature, timestamp, window
         except Exception as e:
@@ -124,89 +256,70 @@ class MMSimpleBackpackTest:
     async def get_balance(self) -> dict:
         """MM-Simple 風格的餘額查詢 - /api/v1/capital"""
         print("\n🎯 測試 MM-Simple 風格餘額查詢...")
-        
-        try:
-            signature, timestamp, window = self.create_signature("balanceQuery")
-            if not signature:
-                return {"error": "簽名創建失敗"}
-            
-            headers = {
-                "X-API-KEY": self.api_key,
-                "X-SIGNATURE": signature,
-                "X-TIMESTAMP": timestamp,
-                "X-WINDOW": window,
-                "Content-Type": "application/json"
-            }
-            
-            url = f"{self.base_url}/api/v1/capital"
-            
-            async with aiohttp.ClientSession() as session:
-                print(f"📡 請求: GET {url}")
-                print(f"📡 Headers: {json.dumps({k: v[:10] + '...' if len(v) > 10 else v for k, v in headers.items()}, indent=2)}")
-                
-                async with session.get(url, headers=headers) as response:
-                    status = response.status
-                    text = await response.text()
-                    
-                    print(f"📨 響應狀態: {status}")
-                    print(f"📨 響應內容: {text}")
-                    
-                    if status == 200:
-                        try:
-                            data = json.loads(text)
-                            return {"status": "success", "data": data}
-                        except json.JSONDecodeError as e:
-                            return {"status": "json_error", "error": str(e), "raw": text}
-                    else:
-                        return {"status": "http_error", "code": status, "response": text}
-                        
-        except Exception as e:
-            print(f"❌ 餘額查詢異常: {e}")
-            return {"status": "exception", "error": str(e)}
+        return await self._signed_get("balanceQuery", "/api/v1/capital")
     
     async def get_collateral(self) -> dict:
         """MM-Simple 風格的抵押品查詢 - /api/v1/capital/collateral"""
         print("\n🎯 測試 MM-Simple 風格抵押品查詢...")
-        
+        return await self._signed_get("collateralQuery", "/api/v1/capital/collateral")
+    
+    async def _signed_get(self, instruction: str, path: str) -> dict:
+        """簽名並發送 GET 請求，返回統一格式的結果字典"""
         try:
-            signature, timestamp, window = self.create_signature("collateralQuery")
+            signature, timestamp, window = self.create_signature(instruction)
             if not signature:
                 return {"error": "簽名創建失敗"}
             
-            headers = {
-                "X-API-KEY": self.api_key,
-                "X-SIGNATURE": signature,
-                "X-TIMESTAMP": timestamp,
-                "X-WINDOW": window,
-                "Content-Type": "application/json"
-            }
-            
-            url = f"{self.base_url}/api/v1/capital/collateral"
+            headers = dict(self._base_headers)
+            headers["X-SIGNATURE"] = signature
+            headers["X-TIMESTAMP"] = timestamp
+            headers["X-WINDOW"] = window
             
-            async with aiohttp.ClientSession() as session:
-                print(f"📡 請求: GET {url}")
+            if self.verbose:
+                print(f"📡 請求: GET {self.base_url}{path}")
                 print(f"📡 Headers: {json.dumps({k: v[:10] + '...' if len(v) > 10 else v for k, v in headers.items()}, indent=2)}")
+            
+            async with self._ensure_session().get(path, headers=headers) as response:
+                status = response.status
+                body = await response.read()
                 
-                async with session.get(url, headers=headers) as response:
-                    status = response.status
-                    text = await response.text()
-                    
+                if self.verbose:
                     print(f"📨 響應狀態: {status}")
-                    print(f"📨 響應內容: {text}")
-                    
-                    if status == 200:
-                        try:
-                            data = json.loads(text)
-                            return {"status": "success", "data": data}
-                        except json.JSONDecodeError as e:
-                            return {"status": "json_error", "error": str(e), "raw": text}
-                    else:
-                        return {"status": "http_error", "code": status, "response": text}
+                    print(f"📨 響應內容: {body.decode('utf-8', 'replace')}")
+                
+                if status == 200:
+                    try:
+                        data = _json_loads(body)
+                        return {"status": "success", "data": data}
+                    except ValueError as e:
+                        return {"status": "json_error", "error": str(e), "raw": body.decode('utf-8', 'replace')}
+                else:
+                    return {"status": "http_error", "code": status, "response": body.decode('utf-8', 'replace')}
                         
         except Exception as e:
-            print(f"❌ 抵押品查詢異常: {e}")
+            print(f"❌ {instruction} 查詢異常: {e}")
             return {"status": "exception", "error": str(e)}
     
+    async def get_all(self, endpoints: list = None) -> dict:
+        """並發查詢多個簽名端點（限制同時請求數），返回 {指令: 結果}"""
+        endpoints = endpoints or SIGNED_ENDPOINTS
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        
+        async def fetch(instruction, path):
+            async with semaphore:
+                return await self._signed_get(instruction, path)
+        
+        results = await asyncio.gather(*(fetch(instruction, path) for instruction, path in endpoints))
+        return {instruction: result for (instruction, _), result in zip(endpoints, results)}
+    
+    def _print_raw_data(self, data) -> None:
+        """輸出原始數據（詳細模式縮進格式化，否則緊湊輸出，數據過大時只輸出摘要）"""
+        print(f"📋 原始數據類型: {type(data)}")
+        if not self.verbose and isinstance(data, (dict, list)) and len(data) > MAX_RAW_ITEMS:
+            print(f"📋 原始數據: 共 {len(data)} 項，已省略（使用 --verbose 查看完整內容）")
+        else:
+            print(f"📋 原始數據: {_json_dumps(data, pretty=self.verbose)}")
+    
     def format_balance_data(self, balance_result: dict) -> None:
         """格式化並顯示餘額數據"""
         print("\n" + "="*60)
@@ -218,8 +331,7 @@ class MMSimpleBackpackTest:
             return
         
         data = balance_result.get("data", {})
-        print(f"📋 原始數據類型: {type(data)}")
-        print(f"📋 原始數據: {json.dumps(data, indent=2)}")
+        self._print_raw_data(data)
         
         if isinstance(data, dict):
             print(f"\n💰 發現 {len(data)} 種資產:")
@@ -254,8 +366,7 @@ class MMSimpleBackpackTest:
             return
         
         data = collateral_result.get("data", {})
-        print(f"📋 原始數據類型: {type(data)}")
-        print(f"📋 原始數據: {json.dumps(data, indent=2)}")
+        self._print_raw_data(data)
         
         if isinstance(data, dict):
             print(f"\n🏦 發現 {len(data)} 種抵押品:")
@@ -274,12 +385,16 @@ class MMSimpleBackpackTest:
         print()
         
         try:
-            # 測試餘額查詢
-            balance_result = await self.get_balance()
-            self.format_balance_data(balance_result)
+            # 餘額與抵押品查詢互不依賴，並發發送
+            balance_result, collateral_result = await asyncio.gather(
+                self.get_balance(), self.get_collateral(), return_exceptions=True
+            )
+            if isinstance(balance_result, BaseException):
+                balance_result = {"status": "exception", "error": str(balance_result)}
+            if isinstance(collateral_result, BaseException):
+                collateral_result = {"status": "exception", "error": str(collateral_result)}
             
-            # 測試抵押品查詢
-            collateral_result = await self.get_collateral()
+            self.format_balance_data(balance_result)
             self.format_collateral_data(collateral_result)
             
             # 總結
@@ -295,10 +410,9 @@ class MMSimpleBackpackTest:
             
             if balance_success:
                 balance_data = balance_result.get("data", {})
-                has_crypto = any(asset != "POINTS" and (
-                    isinstance(details, dict) and (float(details.get('available', 0)) + float(details.get('locked', 0))) > 0
-                    or isinstance(details, (int, float, str)) and float(details) > 0
-                ) for asset, details in balance_data.items() if isinstance(balance_data, dict))
+                has_crypto = isinstance(balance_data, dict) and any(
+                    _is_real(asset, details) for asset, details in balance_data.items()
+                )
                 
                 print(f"💰 是否有真實加密貨幣資產: {'是' if has_crypto else '否，只有 POINTS'}")
         
@@ -367,8 +481,11 @@ async def main():
     else:
         # 正常運行測試
         tester = MMSimpleBackpackTest()
+        if "--verbose" in sys.argv:
+            tester.verbose = True
         if tester.signing_key:
-            await tester.run_tests()
+            async with tester:
+                await tester.run_tests()
 
 if __name__ == "__main__":
     import asyncio